@@ -1,186 +1,383 @@
 import pandas as pd
 import numpy as np
 import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
 
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics.pairwise import cosine_similarity
-
 from database_manager import DatabaseManager
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Numeric columns loaded for comparison cohorts (percentiles and similarity)
+COHORT_FEATURES = (
+    'age', 'rating', 'goals', 'assists', 'market_value', 'pass_accuracy',
+    'key_passes', 'dribbles', 'tackles', 'interceptions'
+)
+
+PERCENTILE_METRICS = {
+    'rating': 'Overall Rating',
+    'goals': 'Goals',
+    'assists': 'Assists',
+    'goals_per_90': 'Goals per 90',
+    'assists_per_90': 'Assists per 90',
+    'market_value': 'Market Value',
+    'pass_accuracy': 'Pass Accuracy',
+    'key_passes': 'Key Passes',
+    'dribbles': 'Dribbles',
+    'tackles': 'Tackles',
+    'interceptions': 'Interceptions'
+}
+
+# Cohort columns returned for each similar player, and the keys they are reported under
+SIMILAR_RECORD_COLS = (
+    'id', 'name', 'club', 'league', 'position', 'age', 'rating',
+    'market_value', 'goals', 'assists', 'minutes_played'
+)
+SIMILAR_RECORD_KEYS = SIMILAR_RECORD_COLS[:-1] + ('minutes',)
+
+# Base market value per league for the expected-value model
+LEAGUE_VALUE_BASE = {'MLS': 1_000_000, 'USL Championship': 200_000, 'USL League One': 50_000}
+
+SIMILARITY_FEATURES = [
+    'age', 'goals_per_90', 'assists_per_90', 'rating',
+    'pass_accuracy', 'key_passes', 'dribbles', 'tackles', 'interceptions'
+]
+
+def _cosine_to_query(X: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Cosine similarity of every row of X against q.
+
+    Row norms and dot products are computed side by side, so X is never
+    normalized into a temporary copy.
+    """
+    dots = X @ q
+    row_norms = np.sqrt(np.einsum('ij,ij->i', X, X))
+    return dots / (row_norms * np.sqrt(q @ q) + 1e-12)
+
 class AdvancedAnalytics:
     """Advanced analytics engine for player and team analysis"""
-    
+
+    # Projections for the bulk queries; columns are constants, never user input
+    _COHORT_COLS = (
+        'id', 'name', 'club', 'league', 'position', 'minutes_played'
+    ) + COHORT_FEATURES
+    _TEAM_COLS = (
+        'name', 'position', 'age', 'rating', 'goals', 'assists', 'market_value'
+    )
+
+    # Fixed statement texts so sqlite3's statement cache reuses the compiled plans
+    _Q_PLAYER = "SELECT * FROM players WHERE id = ?"
+    _Q_COHORT_BASE = f"SELECT {', '.join(_COHORT_COLS)} FROM players WHERE minutes_played > ?"
+    _Q_COHORT = {
+        (): _Q_COHORT_BASE,
+        ('position',): _Q_COHORT_BASE + " AND position = ?",
+        ('league',): _Q_COHORT_BASE + " AND league = ?",
+    }
+    _Q_TEAM = f"SELECT {', '.join(_TEAM_COLS)} FROM players WHERE club = ? AND league = ?"
+
+    _REPORT_CACHE_SIZE = 256
+
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
         self.config = Config()
+        # (player_id, players_version) -> report, kept in LRU order
+        self._report_cache: "OrderedDict[Tuple[int, int], Dict[str, Any]]" = OrderedDict()
+        self._report_lock = threading.Lock()
+        # (filters, min_minutes) -> cohort for _cohort_version; replaced
+        # wholesale when the players table changes
+        self._cohort_cache: Dict[Tuple[Any, int], Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]] = {}
+        self._cohort_version = -1
+        self._cohort_lock = threading.Lock()
 
     def get_player_percentiles(
         self,
         player_id: int,
-        comparison_group: str = 'position'
+        comparison_group: str = 'position',
+        conn: Optional[sqlite3.Connection] = None
     ) -> Dict[str, Any]:
         """Calculate player percentiles against comparison group"""
-        conn = self.db.get_connection()
-        
-        player_query = "SELECT * FROM players WHERE id = ?"
-        player_df = pd.read_sql_query(player_query, conn, params=(player_id,))
-
-        if player_df.empty:
-            conn.close()
+        player = self._fetch_player_dict(player_id, conn)
+        if player is None:
             return {}
 
-        player = player_df.iloc[0]
-
+        version = self.db.players_version
         if comparison_group == 'position':
-            comp_query = (
-                "SELECT * FROM players "
-                "WHERE position = ? AND league = ? AND minutes_played > 900 AND id != ?"
+            # Same-league slice of the position cohort shared with similarity searches
+            ids, matrix, cols = self._cohort(
+                (('position', player['position']),), self.config.MIN_MINUTES, version
             )
-            params = (player['position'], player['league'], player_id)
+            mask = (ids != player_id) & (cols['league'] == player['league'])
         elif comparison_group == 'league':
-            comp_query = (
-                "SELECT * FROM players "
-                "WHERE league = ? AND minutes_played > 900 AND id != ?"
-            )
-            params = (player['league'], player_id)
+            ids, matrix, _ = self._cohort((('league', player['league']),), self.config.MIN_MINUTES, version)
+            mask = ids != player_id
         else:
-            comp_query = (
-                "SELECT * FROM players WHERE minutes_played > 900 AND id != ?"
-            )
-            params = (player_id,)
+            ids, matrix, _ = self._cohort((), self.config.MIN_MINUTES, version)
+            mask = ids != player_id
 
-        comparison_df = pd.read_sql_query(comp_query, conn, params=params)
-        conn.close()
+        return self._percentiles(player, matrix[mask], comparison_group)[0]
 
-        if comparison_df.empty:
-            return {}
+    def find_similar_players(
+        self,
+        player_id: int,
+        num_similar: int = 10,
+        similarity_threshold: float = 0.7,
+        conn: Optional[sqlite3.Connection] = None
+    ) -> List[Dict[str, Any]]:
+        """Find similar players using statistical similarity"""
+        target = self._fetch_player_dict(player_id, conn)
+        if target is None:
+            return []
 
-        metrics = {
-            'rating': 'Overall Rating',
-            'goals': 'Goals',
-            'assists': 'Assists',
-            'goals_per_90': 'Goals per 90',
-            'assists_per_90': 'Assists per 90',
-            'market_value': 'Market Value',
-            'pass_accuracy': 'Pass Accuracy',
-            'key_passes': 'Key Passes',
-            'dribbles': 'Dribbles',
-            'tackles': 'Tackles',
-            'interceptions': 'Interceptions'
-        }
+        ids, matrix, cols = self._cohort(
+            (('position', target['position']),), self.config.MIN_MINUTES, self.db.players_version
+        )
+        return self._similar(
+            target, matrix, cols, np.flatnonzero(ids != player_id),
+            num_similar, similarity_threshold
+        )
+
+    def analyze(
+        self,
+        player_id: int,
+        num_similar: int = 8,
+        similarity_threshold: float = 0.7,
+        conn: Optional[sqlite3.Connection] = None
+    ) -> Dict[str, Any]:
+        """Position percentiles and similar players from a single cohort pass"""
+        bundle = self._compute_report_bundle(player_id, conn, num_similar, similarity_threshold)
+        if bundle is None:
+            return {'percentiles': {}, 'similar': []}
+        _, percentiles, _, _, similar = bundle
+        return {'percentiles': percentiles, 'similar': similar}
+
+    def _compute_report_bundle(
+        self,
+        player_id: int,
+        conn: Optional[sqlite3.Connection] = None,
+        num_similar: int = 5,
+        similarity_threshold: float = 0.7
+    ) -> Optional[Tuple[Dict[str, Any], Dict[str, Any], np.ndarray, np.ndarray, List[Dict[str, Any]]]]:
+        """Load the player and its position cohort once and derive both the
+        percentiles (same-league peers) and the similar players from it"""
+        player = self._fetch_player_dict(player_id, conn)
+        if player is None:
+            return None
+
+        ids, matrix, cols = self._cohort(
+            (('position', player['position']),), self.config.MIN_MINUTES, self.db.players_version
+        )
+        peers = ids != player_id
+        same_league = peers & (cols['league'] == player['league'])
+
+        percentiles, name_array, pct_array = self._percentiles(
+            player, matrix[same_league], 'position'
+        )
+        similar = self._similar(
+            player, matrix, cols, np.flatnonzero(peers), num_similar, similarity_threshold
+        )
+        return player, percentiles, name_array, pct_array, similar
+
+    def _percentiles(
+        self,
+        player: Dict[str, Any],
+        arr: np.ndarray,
+        comparison_group: str
+    ) -> Tuple[Dict[str, Any], np.ndarray, np.ndarray]:
+        """Rank a player against a cohort matrix over COHORT_FEATURES.
+
+        Alongside the percentile dict, returns the metric labels and their
+        rounded percentiles as parallel arrays.
+        """
+        if len(arr) < max(self.config.MIN_COHORT_SIZE, 1):
+            # Too few peers for meaningful percentiles
+            return {
+                'player_name': player['name'],
+                'comparison_group': comparison_group,
+                'sample_size': len(arr),
+                'percentiles': {},
+                'insufficient_sample': True
+            }, np.array([], dtype=object), np.array([], dtype=np.float64)
+
+        metric_cols = [
+            m for m in PERCENTILE_METRICS if m in COHORT_FEATURES and pd.notna(player[m])
+        ]
+        idx = [COHORT_FEATURES.index(m) for m in metric_cols]
+
+        # Rank every metric in one pass; the player's own value counts towards the totals
+        sample_size = len(arr)
+        arr = arr[:, idx]
+        pv = np.array([player[m] for m in metric_cols], dtype=np.float64)
+        totals = (~np.isnan(arr)).sum(axis=0) + 1
+        pct_array = np.round(((arr <= pv).sum(axis=0) + 1) / totals * 100, 1)
+        name_array = np.array([PERCENTILE_METRICS[m] for m in metric_cols], dtype=object)
 
         percentiles: Dict[str, Any] = {}
 
-        for metric, name in metrics.items():
-            if metric in player and pd.notna(player[metric]):
-                val = player[metric]
-                all_vals = comparison_df[metric].dropna().tolist() + [val]
-                series = pd.Series(all_vals)
-                pct = (series <= val).sum() / len(all_vals) * 100
-                rank = len(all_vals) - series.rank(method='dense').iloc[-1] + 1
-                percentiles[name] = {
-                    'value': val,
-                    'percentile': round(pct, 1),
-                    'rank': int(rank),
-                    'total': len(all_vals)
-                }
+        for j, metric in enumerate(metric_cols):
+            # Dense rank: distinct cohort values <= the player's, plus the player's own if new
+            uniq = np.unique(arr[:, j][~np.isnan(arr[:, j])])
+            k = np.searchsorted(uniq, pv[j], side='right')
+            dense = k + int(k == 0 or uniq[k - 1] != pv[j])
+            percentiles[name_array[j]] = {
+                'value': player[metric],
+                'percentile': pct_array[j],
+                'rank': int(totals[j] - dense + 1),
+                'total': int(totals[j])
+            }
 
         return {
             'player_name': player['name'],
             'comparison_group': comparison_group,
-            'sample_size': len(comparison_df),
+            'sample_size': sample_size,
             'percentiles': percentiles
-        }
+        }, name_array, pct_array
 
-    def find_similar_players(
+    def _similar(
         self,
-        player_id: int,
-        num_similar: int = 10,
-        similarity_threshold: float = 0.7
+        target: Dict[str, Any],
+        matrix: np.ndarray,
+        cols: Dict[str, np.ndarray],
+        candidates: np.ndarray,
+        num_similar: int,
+        similarity_threshold: float
     ) -> List[Dict[str, Any]]:
-        """Find similar players using statistical similarity"""
-        conn = self.db.get_connection()
-        target_query = "SELECT * FROM players WHERE id = ?"
-        target_df = pd.read_sql_query(target_query, conn, params=(player_id,))
-        
-        if target_df.empty:
-            conn.close()
+        """Rank the candidate cohort rows by cosine similarity to the target player"""
+        if len(candidates) < max(self.config.MIN_COHORT_SIZE, 1):
             return []
 
-        target = target_df.iloc[0]
-        comp_query = (
-            "SELECT * FROM players "
-            "WHERE position = ? AND minutes_played > 900 AND id != ?"
-        )
-        comparison_df = pd.read_sql_query(comp_query, conn, params=(target['position'], player_id))
-        conn.close()
+        existing = [COHORT_FEATURES.index(f) for f in SIMILARITY_FEATURES if f in COHORT_FEATURES]
+        target_row = np.array([[target[COHORT_FEATURES[i]] for i in existing]], dtype=np.float64)
+        # Standardized cosine does not need double precision; float32 halves the bytes
+        all_players = np.vstack([target_row, matrix[np.ix_(candidates, existing)]], dtype=np.float32)
+        col_means = np.nanmean(all_players, axis=0)
+        matrix = np.where(np.isnan(all_players), col_means, all_players)
 
-        if comparison_df.empty:
-            return []
+        sd = matrix.std(axis=0)
+        sd[sd == 0] = 1.0
+        norm = (matrix - matrix.mean(axis=0)) / sd
 
-        features = [
-            'age', 'goals_per_90', 'assists_per_90', 'rating',
-            'pass_accuracy', 'key_passes', 'dribbles', 'tackles', 'interceptions'
+        sims = _cosine_to_query(norm[1:], norm[0])
+
+        # Only the top-K rows above the threshold are turned into records
+        above = np.flatnonzero(sims >= similarity_threshold)
+        top = above[np.argsort(-sims[above], kind='stable')[:num_similar]]
+        rows = candidates[top]
+        records = [
+            dict(zip(SIMILAR_RECORD_KEYS, values))
+            for values in zip(*(cols[c][rows] for c in SIMILAR_RECORD_COLS))
         ]
-        existing = [f for f in features if f in comparison_df.columns]
-        all_players = pd.concat([target_df, comparison_df], ignore_index=True)
-        matrix = all_players[existing].fillna(all_players[existing].mean())
-
-        scaler = StandardScaler()
-        norm = scaler.fit_transform(matrix)
-        sim_matrix = cosine_similarity(norm)
-
-        sims = sim_matrix[0, 1:]
-        similar: List[Dict[str, Any]] = []
-        for idx, sim in enumerate(sims):
-            if sim >= similarity_threshold:
-                p = comparison_df.iloc[idx]
-                similar.append({
-                    'id': p['id'],
-                    'name': p['name'],
-                    'club': p['club'],
-                    'league': p['league'],
-                    'position': p['position'],
-                    'age': p['age'],
-                    'rating': p['rating'],
-                    'market_value': p['market_value'],
-                    'similarity_score': round(sim*100,1),
-                    'goals': p['goals'],
-                    'assists': p['assists'],
-                    'minutes': p['minutes_played']
-                })
-
-        similar.sort(key=lambda x: x['similarity_score'], reverse=True)
-        return similar[:num_similar]
+
+        for rec, sim in zip(records, sims[top]):
+            rec['similarity_score'] = round(float(sim) * 100, 1)
+        return records
+
+    def _connection(self, conn: Optional[sqlite3.Connection] = None):
+        """Reuse the caller's connection, or fall back to the shared one"""
+        return nullcontext(conn) if conn is not None else self.db.connection()
+
+    def _fetch_player_dict(
+        self,
+        player_id: int,
+        conn: Optional[sqlite3.Connection] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Fetch a single player row as a dict, or None if it does not exist"""
+        with self._connection(conn) as conn:
+            cur = conn.execute(self._Q_PLAYER, (player_id,))
+            row = cur.fetchone()
+        return dict(zip([d[0] for d in cur.description], row)) if row else None
+
+    def _cohort(
+        self,
+        filters: Tuple[Tuple[str, Any], ...],
+        min_minutes: int,
+        players_version: int
+    ) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """Load a comparison cohort once per data version.
+
+        Returns the player ids, a float matrix over COHORT_FEATURES and the
+        raw column values as object arrays (column name -> array), which
+        keep the database's Python types for building result records.
+        """
+        key = (filters, min_minutes)
+        with self._cohort_lock:
+            if players_version > self._cohort_version:
+                # Cohorts of older versions are dropped rather than aged out
+                self._cohort_cache = {}
+                self._cohort_version = players_version
+            cohort = self._cohort_cache.get(key) if players_version == self._cohort_version else None
+        if cohort is not None:
+            return cohort
+
+        cohort = self._load_cohort(filters, min_minutes)
+        with self._cohort_lock:
+            if players_version == self._cohort_version:
+                self._cohort_cache[key] = cohort
+        return cohort
+
+    def _load_cohort(
+        self,
+        filters: Tuple[Tuple[str, Any], ...],
+        min_minutes: int
+    ) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """Query a comparison cohort from the database"""
+        q = self._Q_COHORT[tuple(col for col, _ in filters)]
+        params = [min_minutes] + [val for _, val in filters]
+        with self.db.connection() as conn:
+            rows = conn.execute(q, params).fetchall()
+
+        columns = list(zip(*rows)) or [()] * len(self._COHORT_COLS)
+        cols = {}
+        for name, values in zip(self._COHORT_COLS, columns):
+            arr = np.empty(len(values), dtype=object)
+            arr[:] = values
+            cols[name] = arr
+        ids = cols['id'].astype(np.int64)
+        matrix = np.array(
+            [cols[f] for f in COHORT_FEATURES], dtype=np.float64
+        ).reshape(len(COHORT_FEATURES), -1).T.copy()
+        return ids, matrix, cols
 
     def generate_player_report(self, player_id: int) -> Dict[str, Any]:
         """Generate comprehensive player scouting report"""
-        conn = self.db.get_connection()
-        q = "SELECT * FROM players WHERE id = ?"
-        df = pd.read_sql_query(q, conn, params=(player_id,))
-        if df.empty:
-            conn.close()
-            return {}
-        player = df.iloc[0].to_dict()
+        key = (player_id, self.db.players_version)
+        with self._report_lock:
+            report = self._report_cache.get(key)
+            if report is not None:
+                self._report_cache.move_to_end(key)
+                return dict(report)
+
+        report = self._build_player_report(player_id)
+
+        with self._report_lock:
+            self._report_cache[key] = report
+            if len(self._report_cache) > self._REPORT_CACHE_SIZE:
+                self._report_cache.popitem(last=False)
+        return dict(report)
 
-        percentiles = self.get_player_percentiles(player_id)
-        similar = self.find_similar_players(player_id, num_similar=5)
+    def _build_player_report(self, player_id: int) -> Dict[str, Any]:
+        """Compute a scouting report from the database"""
+        bundle = self._compute_report_bundle(player_id)
+        if bundle is None:
+            return {}
+        player, percentiles, name_array, pct_array, similar = bundle
 
-        strengths, weaknesses = [], []
-        for metric, data in percentiles.get('percentiles', {}).items():
-            pct = data['percentile']
-            if pct >= 80: strengths.append({**data, 'metric': metric})
-            elif pct <= 30: weaknesses.append({**data, 'metric': metric})
+        by_metric = percentiles.get('percentiles', {})
+        strengths = [
+            {**by_metric[name_array[i]], 'metric': name_array[i]}
+            for i in np.flatnonzero(pct_array >= 80)
+        ]
+        weaknesses = [
+            {**by_metric[name_array[i]], 'metric': name_array[i]}
+            for i in np.flatnonzero(pct_array <= 30)
+        ]
 
         rec = self._generate_recommendation(player, percentiles, strengths, weaknesses)
         val_assess = self._assess_player_value(player, percentiles)
 
-        conn.close()
         return {
             'player': player,
             'percentiles': percentiles,
@@ -265,47 +462,87 @@ class AdvancedAnalytics:
         league: str
     ) -> float:
         """Simple model to calculate expected market value"""
-        multipliers = {'MLS':1_000_000, 'USL Championship':200_000, 'USL League One':50_000}
-        base = multipliers.get(league,100_000)
-        rm = (rating/6.5)**2
-        am = 1.0
-        if age<23: am=0.7+(age-20)*0.1
-        elif age>29: am=1.0-(age-29)*0.08
-        val = base*rm*am
-        return max(val,50_000)
+        return float(self._expected_values(np.array([rating]), np.array([age]), [league])[0])
+
+    def _expected_values(
+        self,
+        rating: np.ndarray,
+        age: np.ndarray,
+        league: Any
+    ) -> np.ndarray:
+        """Vectorized expected market value for arrays of players"""
+        base = (
+            pd.Series(league, dtype=object).map(LEAGUE_VALUE_BASE)
+            .fillna(100_000).to_numpy(dtype=np.float64)
+        )
+        rating = np.asarray(rating, dtype=np.float64)
+        age = np.asarray(age, dtype=np.float64)
+        rm = (rating / 6.5) ** 2
+        am = np.where(age < 23, 0.7 + (age - 20) * 0.1,
+                      np.where(age > 29, 1.0 - (age - 29) * 0.08, 1.0))
+        return np.maximum(base * rm * am, 50_000)
 
     def get_team_analytics(
         self,
         team_name: str,
-        league: str
+        league: str,
+        conn: Optional[sqlite3.Connection] = None
     ) -> Dict[str, Any]:
         """Generate team-level analytics"""
-        conn = self.db.get_connection()
-        q = "SELECT * FROM players WHERE club = ? AND league = ?"
-        df = pd.read_sql_query(q, conn, params=(team_name, league))
+        with self._connection(conn) as conn:
+            df = pd.read_sql_query(self._Q_TEAM, conn, params=(team_name, league))
         if df.empty:
-            conn.close()
             return {}
+        ages = df['age'].to_numpy(dtype=np.float64)
+        ratings = df['rating'].to_numpy(dtype=np.float64)
+        avg_rating = np.nanmean(ratings)
+        # Buckets: <23, 23-29, exactly 30 (not reported), 31+
+        age_counts = np.bincount(np.digitize(ages[~np.isnan(ages)], [23, 30, 31]), minlength=4)
+        # One grouping serves both the position distribution and the weak positions
+        pos_stats = df.groupby('position').agg(
+            count=('position', 'size'),
+            mean_rating=('rating', 'mean')
+        )
         analytics = {
             'team_name': team_name,
             'league': league,
             'squad_size': len(df),
-            'average_age': round(df['age'].mean(),1),
-            'total_market_value': df['market_value'].sum(),
-            'average_rating': round(df['rating'].mean(),2),
-            'total_goals': df['goals'].sum(),
-            'total_assists': df['assists'].sum(),
-            'position_distribution': df['position'].value_counts().to_dict(),
+            'average_age': round(np.nanmean(ages),1),
+            'total_market_value': np.nansum(df['market_value'].to_numpy(dtype=np.float64)),
+            'expected_market_value': float(np.nansum(self._expected_values(
+                ratings, ages, [league] * len(df)
+            ))),
+            'average_rating': round(avg_rating,2),
+            'total_goals': int(np.nansum(df['goals'].to_numpy(dtype=np.float64))),
+            'total_assists': int(np.nansum(df['assists'].to_numpy(dtype=np.float64))),
+            'position_distribution': pos_stats['count'].sort_values(ascending=False).to_dict(),
             'age_distribution': {
-                'U23': len(df[df['age']<23]),
-                '23-29': len(df[(df['age']>=23)&(df['age']<=29)]),
-                'Over30': len(df[df['age']>30])
+                'U23': int(age_counts[0]),
+                '23-29': int(age_counts[1]),
+                'Over30': int(age_counts[3])
             }
         }
-        top = df.nlargest(5,'rating')[['name','position','rating','goals','assists']]
-        analytics['top_performers'] = top.to_dict('records')
-        weak = df.groupby('position')['rating'].mean()
-        weak = weak[weak < df['rating'].mean() - 0.5]
+        analytics['top_performers'] = df.iloc[self._top_k(ratings, 5)][
+            ['name','position','rating','goals','assists']
+        ].to_dict('records')
+        weak = pos_stats.loc[pos_stats['mean_rating'] < avg_rating - 0.5, 'mean_rating']
         analytics['weak_positions'] = weak.to_dict()
-        conn.close()
         return analytics
+
+    @staticmethod
+    def _top_k(values: np.ndarray, k: int) -> np.ndarray:
+        """Positions of the k largest values, highest first.
+
+        Matches DataFrame.nlargest(keep='first'): ties go to the earlier row,
+        and NaN rows only fill the tail when there are fewer than k values.
+        """
+        valid = np.flatnonzero(~np.isnan(values))
+        nan_fill = np.flatnonzero(np.isnan(values))[:max(k - len(valid), 0)]
+        k = min(k, len(valid))
+        if k == 0:
+            return nan_fill
+        cand = valid[np.argpartition(-values[valid], k - 1)[:k]]
+        cutoff = values[cand].min()
+        above = np.flatnonzero(values > cutoff)
+        idx = np.concatenate([above, np.flatnonzero(values == cutoff)[:k - len(above)]])
+        return np.concatenate([idx[np.argsort(-values[idx], kind='stable')], nan_fill])
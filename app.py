@@ -1,13 +1,15 @@
 # app.py (Part 1 of 6)
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import numpy as np
 from datetime import datetime, timedelta
 import json
 import os
+import re
+import sqlite3
+import time
 from io import BytesIO
-import xlsxwriter
+# plotly and xlsxwriter are imported where they are used to keep cold starts fast
 
 # Import our modules
 from database_manager import DatabaseManager
@@ -96,6 +98,16 @@ def init_components():
 
 db_manager, aggregator, analytics = init_components()
 
+@st.cache_resource
+def get_sqlite():
+    """Shared read connection for the UI, tuned once per process"""
+    conn = sqlite3.connect(db_manager.db_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
 # Helper functions
 def format_value(value):
     """Format market value for display"""
@@ -107,27 +119,296 @@ def format_value(value):
         return f"${value/1000:.0f}K"
     return f"${value:,.0f}"
 
+def format_values(values):
+    """Vectorized format_value for a column of market values"""
+    v = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+    out = np.full(v.shape, "N/A", dtype=object)
+    millions = v >= 1000000
+    thousands = (v >= 1000) & ~millions
+    rest = ~(np.isnan(v) | (v == 0) | millions | thousands)
+    out[millions] = np.char.add(np.char.add("$", np.char.mod("%.1f", v[millions] / 1000000)), "M")
+    out[thousands] = np.char.add(np.char.add("$", np.char.mod("%.0f", v[thousands] / 1000)), "K")
+    # Small (or negative) values are rare; they keep the thousands separator
+    out[rest] = [f"${x:,.0f}" for x in v[rest]]
+    return out
+
 def format_datetime(dt):
     """Format datetime for display"""
     if isinstance(dt, str):
         dt = datetime.fromisoformat(dt)
     return dt.strftime("%Y-%m-%d %H:%M")
 
+SOURCE_ID_COLUMNS = {
+    "FBref": "fbref_id",
+    "Transfermarkt": "transfermarkt_id",
+    "ASA": "asa_id",
+    "Sofascore": "sofascore_id",
+}
+SOURCE_TITLES = ["FBref", "TM", "ASA", "Sofascore"]
+SOURCE_BITS = np.array([1, 2, 4, 8])
+
+# Prebuilt indicator HTML and compact "F·T·A·S" labels for all 16 source combinations
+SOURCE_INDICATOR_HTML = np.array([
+    "".join(
+        f'<span class="source-indicator {"source-active" if code & bit else "source-inactive"}" '
+        f'title="{title}"></span>'
+        for title, bit in zip(SOURCE_TITLES, SOURCE_BITS)
+    )
+    for code in range(16)
+])
+SOURCE_LABELS = np.array([
+    "·".join(letter if code & bit else "-" for letter, bit in zip("FTAS", SOURCE_BITS))
+    for code in range(16)
+])
+
+def source_codes(players_df):
+    """Encode which source ids each player has as a 0-15 bitmask"""
+    return players_df[list(SOURCE_ID_COLUMNS.values())].notna().to_numpy().dot(SOURCE_BITS)
+
 def get_source_indicators(player):
     """Get HTML for source indicators"""
-    sources = {
-        'FBref': player.get('fbref_id') is not None,
-        'TM': player.get('transfermarkt_id') is not None,
-        'ASA': player.get('asa_id') is not None,
-        'Sofascore': player.get('sofascore_id') is not None
-    }
+    code = sum(
+        int(bit) for col, bit in zip(SOURCE_ID_COLUMNS.values(), SOURCE_BITS)
+        if pd.notna(player.get(col))
+    )
+    return SOURCE_INDICATOR_HTML[code]
+
+# Cached data loaders - keyed on hashable filter arguments so unchanged
+# reruns skip SQLite and pandas entirely. Cleared after each sync.
+PLAYER_LIST_COLUMNS = (
+    "id, name, position, club, league, age, rating, market_value, minutes_played, "
+    "goals, assists, fbref_id, transfermarkt_id, asa_id, sofascore_id"
+)
+PLAYER_SORT_COLUMNS = ["rating", "market_value", "goals", "assists", "age", "minutes_played"]
+PLAYERS_PAGE_SIZE = 50
+ANALYTICS_CANDIDATE_LIMIT = 500
+TEAM_SORT_COLUMNS = ["total_value", "avg_rating", "total_goals", "squad_size"]
+SEARCH_RESULT_COLUMNS = ["name", "position", "club", "league", "age",
+                         "rating", "market_value", "goals", "assists"]
+SEARCH_FILTER_COLUMNS = frozenset([
+    "name", "age", "position", "club", "league", "nationality", "market_value",
+    "rating", "goals", "assists", "matches", "minutes_played", "pass_accuracy",
+    "shots_per_game", "key_passes", "dribbles", "aerial_duels", "tackles",
+    "interceptions", "clearances", "yellow_cards", "red_cards"
+])
+SEARCH_KEYWORDS = frozenset(["AND", "OR", "NOT", "IN", "IS", "NULL", "LIKE", "BETWEEN"])
+SEARCH_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<number>\d+(?:\.\d*)?|\.\d+)
+      | (?P<string>'(?:[^']|'')*')
+      | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<op><=|>=|<>|!=|=|<|>|-|\(|\)|,)
+    )""", re.VERBOSE)
+
+def build_search_predicate(search_query):
+    """Validate a search expression against the column/keyword allowlist and
+    return it as a parameterized predicate plus its bound values"""
+    tokens, params = [], []
+    pos, end = 0, len(search_query.rstrip())
+    while pos < end:
+        match = SEARCH_TOKEN_RE.match(search_query, pos)
+        if match is None:
+            raise ValueError(f"Unexpected input near: {search_query[pos:pos + 20].strip()!r}")
+        kind, text = match.lastgroup, match.group(match.lastgroup)
+        if kind == "word":
+            if text.upper() in SEARCH_KEYWORDS:
+                tokens.append(text.upper())
+            elif text.lower() in SEARCH_FILTER_COLUMNS:
+                tokens.append(text.lower())
+            else:
+                raise ValueError(f"Unknown column or keyword: {text}")
+        elif kind == "number":
+            tokens.append("?")
+            params.append(float(text) if "." in text else int(text))
+        elif kind == "string":
+            tokens.append("?")
+            params.append(text[1:-1].replace("''", "'"))
+        else:
+            tokens.append(text)
+        pos = match.end()
+    if not tokens:
+        raise ValueError("Enter at least one search condition")
+    return " ".join(tokens), params
+
+@st.cache_data(ttl=60)
+def load_players(league, position, age_lo, age_hi, min_rating, min_minutes,
+                 has_market_value, max_value, search_term, data_sources,
+                 sort_by="rating", ascending=False, page=1, page_size=PLAYERS_PAGE_SIZE):
+    """Load one sorted page of players matching the Players-tab filters.
+    
+    Returns (total matching players, page DataFrame).
+    """
+    if sort_by not in PLAYER_SORT_COLUMNS:
+        raise ValueError(f"Unsupported sort column: {sort_by}")
+    
+    query = " FROM players WHERE 1=1"
+    params = []
+    
+    if league != "All":
+        query += " AND league = ?"
+        params.append(league)
+    
+    if position != "All":
+        query += " AND position = ?"
+        params.append(position)
+    
+    query += " AND age BETWEEN ? AND ?"
+    params.extend([age_lo, age_hi])
     
-    html = ""
-    for source, active in sources.items():
-        status_class = "source-active" if active else "source-inactive"
-        html += f'<span class="source-indicator {status_class}" title="{source}"></span>'
+    query += " AND rating >= ?"
+    params.append(min_rating)
+    
+    query += " AND minutes_played >= ?"
+    params.append(min_minutes)
+    
+    if has_market_value:
+        query += " AND market_value > 0"
+    
+    query += " AND market_value <= ?"
+    params.append(max_value)
+    
+    if search_term:
+        query += " AND (name LIKE ? OR club LIKE ?)"
+        params.extend([f"%{search_term}%", f"%{search_term}%"])
+    
+    # Add data source filters
+    source_conditions = [
+        f"{SOURCE_ID_COLUMNS[source]} IS NOT NULL"
+        for source in data_sources if source in SOURCE_ID_COLUMNS
+    ]
+    if source_conditions:
+        query += f" AND ({' OR '.join(source_conditions)})"
     
-    return html
+    # NULLs sort last in both directions, matching the old pandas sort
+    order = (
+        f" ORDER BY {sort_by} IS NULL, {sort_by} {'ASC' if ascending else 'DESC'}, id"
+        " LIMIT ? OFFSET ?"
+    )
+    
+    conn = get_sqlite()
+    total = conn.execute("SELECT COUNT(*)" + query, params).fetchone()[0]
+    # Arrow-backed columns hand straight to st.dataframe without an object->Arrow pass
+    page_df = pd.read_sql_query(
+        f"SELECT {PLAYER_LIST_COLUMNS}" + query + order,
+        conn,
+        params=params + [page_size, (page - 1) * page_size],
+        dtype_backend='pyarrow'
+    )
+    return total, page_df
+
+@st.cache_data(ttl=300)
+def load_teams(league="All", sort_metric="total_value"):
+    """Load precomputed per-team aggregates for the Teams tab, sorted descending"""
+    if sort_metric not in TEAM_SORT_COLUMNS:
+        raise ValueError(f"Unsupported sort column: {sort_metric}")
+    
+    query = "SELECT * FROM team_aggregates"
+    params = []
+    if league != "All":
+        query += " WHERE league = ?"
+        params.append(league)
+    query += f" ORDER BY {sort_metric} IS NULL, {sort_metric} DESC, total_value DESC"
+    return pd.read_sql_query(query, get_sqlite(), params=params)
+
+@st.cache_data(ttl=600)
+def load_team_leagues():
+    """Distinct team leagues, richest squads' leagues first"""
+    rows = get_sqlite().execute(
+        "SELECT league FROM team_aggregates GROUP BY league ORDER BY MAX(total_value) DESC"
+    ).fetchall()
+    return [row[0] for row in rows]
+
+@st.cache_data(ttl=60)
+def load_watchlist(player_ids):
+    """Load the watchlisted players"""
+    # One JSON-array bind keeps the statement text fixed for any watchlist size
+    watchlist_query = """
+        SELECT * FROM players 
+        WHERE id IN (SELECT value FROM json_each(?))
+    """
+    conn = get_sqlite()
+    return pd.read_sql_query(
+        watchlist_query, conn, params=[json.dumps([int(i) for i in player_ids])]
+    )
+
+@st.cache_data(ttl=300)
+def load_all_players_for_analytics(search_term=""):
+    """Load the top-rated Analytics-tab player options as {label: player id}"""
+    query = "SELECT id, name, club, league FROM players"
+    params = []
+    if search_term:
+        query += " WHERE name LIKE ? OR club LIKE ?"
+        params.extend([f"%{search_term}%", f"%{search_term}%"])
+    query += " ORDER BY rating DESC LIMIT ?"
+    params.append(ANALYTICS_CANDIDATE_LIMIT)
+    
+    conn = get_sqlite()
+    players = pd.read_sql_query(query, conn, params=params)
+    labels = (
+        players['name'].astype(str) + " (" + players['club'].astype(str)
+        + " - " + players['league'].astype(str) + ")"
+    )
+    return dict(zip(labels, players['id'].tolist()))
+
+@st.cache_data(ttl=300)
+def load_report_players():
+    """Load the scouting-report player options as {label: player id}"""
+    conn = get_sqlite()
+    players = pd.read_sql_query(
+        "SELECT id, name, club, league FROM players WHERE rating > 6.5 ORDER BY rating DESC",
+        conn
+    )
+    labels = players['name'].astype(str) + " (" + players['club'].astype(str) + ")"
+    return dict(zip(labels, players['id'].tolist()))
+
+@st.cache_data(ttl=300)
+def analyze_player(player_id):
+    """Percentiles and similar players for the Analytics tab"""
+    return analytics.analyze(player_id, num_similar=8)
+
+@st.cache_data(ttl=600)
+def build_report(player_id):
+    """Generate (and cache) the scouting report for a player"""
+    return analytics.generate_player_report(player_id)
+
+@st.cache_data(ttl=600)
+def build_report_text(player_id):
+    """Render the cached scouting report as downloadable plain text"""
+    report = build_report(player_id)
+    player_info = report['player']
+    rec = report['recommendation']
+    value = report['value_assessment']
+    return f"""
+PLAYER SCOUTING REPORT
+Generated: {format_datetime(report['generated_at'])}
+
+PLAYER: {player_info['name']}
+Position: {player_info['position']}
+Club: {player_info['club']}
+League: {player_info['league']}
+Age: {player_info['age']}
+Market Value: {format_value(player_info['market_value'])}
+
+PERFORMANCE METRICS
+Rating: {player_info['rating']}
+Goals: {player_info['goals']}
+Assists: {player_info['assists']}
+Minutes: {player_info['minutes_played']}
+
+RECOMMENDATION
+{rec['overall_assessment']}
+Suggested Action: {rec['suggested_action']}
+
+VALUE ASSESSMENT
+Current Value: {format_value(value['current_value'])}
+Assessment: {value['value_rating']}
+Projection: {value['projection']}
+"""
+
+@st.cache_data(ttl=300)
+def load_coverage_reports(leagues):
+    """Load per-league source coverage from one grouped query"""
+    return aggregator.get_data_coverage_reports(list(leagues))
 
 # Sidebar
 with st.sidebar:
@@ -162,7 +443,14 @@ with st.sidebar:
             progress_bar = st.progress(0)
             status_text = st.empty()
             
+            last_update = [0.0]
+            
             def update_progress(progress, message):
+                # Coalesce UI redraws to at most one per 100ms; always show completion
+                now = time.monotonic()
+                if progress < 1.0 and now - last_update[0] < 0.1:
+                    return
+                last_update[0] = now
                 progress_bar.progress(progress)
                 status_text.text(message)
             
@@ -170,6 +458,8 @@ with st.sidebar:
                 results = aggregator.sync_league_data(sync_league, update_progress)
                 
                 st.session_state.last_sync[sync_league] = datetime.now()
+                # Player data changed - drop cached query results
+                st.cache_data.clear()
                 
                 # Show results
                 st.success(f"✅ Sync completed successfully!")
@@ -186,7 +476,33 @@ with st.sidebar:
                             
             except Exception as e:
                 st.error(f"❌ Sync failed: {str(e)}")
-    
+
+    if st.button("🌎 Sync All Leagues", use_container_width=True):
+        with st.spinner("Syncing all leagues..."):
+            progress_bar = st.progress(0)
+            status_text = st.empty()
+
+            def update_all_progress(progress, message):
+                progress_bar.progress(progress)
+                status_text.text(message)
+
+            try:
+                all_results = aggregator.sync_leagues(list(Config.LEAGUE_CONFIG), update_all_progress)
+
+                synced_at = datetime.now()
+                for league in all_results:
+                    st.session_state.last_sync[league] = synced_at
+                st.cache_data.clear()
+
+                st.success("✅ All leagues synced!")
+                for league, results in all_results.items():
+                    st.metric(league, results['total_players'])
+                    for error in results['errors']:
+                        st.error(f"{league}: {error}")
+
+            except Exception as e:
+                st.error(f"❌ Sync failed: {str(e)}")
+
     # Cache Management
     st.subheader("💾 Cache Management")
     
@@ -198,16 +514,13 @@ with st.sidebar:
     
     with col2:
         if st.button("View Stats"):
-            conn = db_manager.get_connection()
-            cache_size = pd.read_sql_query(
-                "SELECT COUNT(*) as count, MIN(expiry) as oldest, MAX(expiry) as newest FROM cache",
-                conn
-            ).iloc[0]
-            conn.close()
+            count, oldest, newest = get_sqlite().execute(
+                "SELECT COUNT(*), MIN(expiry), MAX(expiry) FROM cache"
+            ).fetchone()
             
-            st.write(f"Entries: {cache_size['count']}")
-            if cache_size['oldest']:
-                st.write(f"Oldest: {cache_size['oldest'][:10]}")
+            st.write(f"Entries: {count}")
+            if oldest:
+                st.write(f"Oldest: {oldest[:10]}")
     
     # Sync History
     with st.expander("📊 Sync History"):
@@ -233,7 +546,8 @@ tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
 ])
 
 # Players Tab
-with tab1:
+@st.fragment
+def render_players_tab():
     st.subheader("Player Database")
     
     # Filters
@@ -293,157 +607,95 @@ with tab1:
                 ["FBref", "Transfermarkt", "ASA", "Sofascore"]
             )
     
-    # Build query
-    conn = db_manager.get_connection()
-    query = "SELECT * FROM players WHERE 1=1"
-    params = []
-    
-    if league_filter != "All":
-        query += " AND league = ?"
-        params.append(league_filter)
-    
-    if position_filter != "All":
-        query += " AND position = ?"
-        params.append(position_filter)
-    
-    query += " AND age BETWEEN ? AND ?"
-    params.extend(age_range)
-    
-    query += " AND rating >= ?"
-    params.append(min_rating)
-    
-    query += " AND minutes_played >= ?"
-    params.append(min_minutes)
-    
-    if has_market_value:
-        query += " AND market_value > 0"
-    
-    query += " AND market_value <= ?"
-    params.append(max_value)
-    
-    if search_term:
-        query += " AND (name LIKE ? OR club LIKE ?)"
-        params.extend([f"%{search_term}%", f"%{search_term}%"])
+    # Sort and page options
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        sort_by = st.selectbox("Sort by", PLAYER_SORT_COLUMNS)
+    with col2:
+        sort_order = st.radio("Order", ["Desc", "Asc"])
+    with col3:
+        page = st.number_input("Page", min_value=1, value=1, step=1, key="player_page")
     
-    # Add data source filters
-    if data_sources:
-        source_conditions = []
-        if "FBref" in data_sources:
-            source_conditions.append("fbref_id IS NOT NULL")
-        if "Transfermarkt" in data_sources:
-            source_conditions.append("transfermarkt_id IS NOT NULL")
-        if "ASA" in data_sources:
-            source_conditions.append("asa_id IS NOT NULL")
-        if "Sofascore" in data_sources:
-            source_conditions.append("sofascore_id IS NOT NULL")
-        
-        if source_conditions:
-            query += f" AND ({' OR '.join(source_conditions)})"
+    filters = (
+        league_filter, position_filter, age_range[0], age_range[1], min_rating,
+        min_minutes, has_market_value, max_value, search_term, tuple(data_sources),
+        sort_by, sort_order == "Asc"
+    )
+    page = int(page)
+    total_players, players_df = load_players(*filters, page)
     
-    # Execute query
-    players_df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
+    # Narrower filters can leave the chosen page past the end; show the last one
+    total_pages = max(1, -(-total_players // PLAYERS_PAGE_SIZE))
+    if page > total_pages:
+        page = total_pages
+        total_players, players_df = load_players(*filters, page)
     
     # Display results
-    st.write(f"Found **{len(players_df)}** players")
+    st.write(f"Found **{total_players}** players (page {page} of {total_pages})")
     
     if not players_df.empty:
-        # Sort options
-        col1, col2 = st.columns([3, 1])
-        with col1:
-            sort_by = st.selectbox(
-                "Sort by",
-                ["rating", "market_value", "goals", "assists", "age", "minutes_played"]
-            )
-        with col2:
-            sort_order = st.radio("Order", ["Desc", "Asc"])
+        # One table for the whole page; row selection drives the actions below
+        display_df = players_df[['name', 'position', 'club', 'league', 'age', 'rating',
+                                 'market_value', 'goals', 'assists']].copy()
+        display_df['market_value'] = format_values(display_df['market_value'])
+        codes = source_codes(players_df)
+        display_df['sources'] = SOURCE_LABELS[codes]
         
-        players_df = players_df.sort_values(
-            sort_by, 
-            ascending=(sort_order == "Asc")
+        event = st.dataframe(
+            display_df,
+            use_container_width=True,
+            hide_index=True,
+            on_select="rerun",
+            selection_mode="single-row",
+            key="players_table"
         )
         
-        # Display players
-        for idx, player in players_df.iterrows():
-            with st.container():
-                col1, col2, col3, col4, col5 = st.columns([3, 2, 2, 1, 1])
-                
-                with col1:
-                    st.markdown(f"### {player['name']}")
-                    st.write(f"{player['position']} • {player['club']} • {player['league']}")
-                    st.markdown(get_source_indicators(player), unsafe_allow_html=True)
-                
-                with col2:
-                    st.metric("Rating", f"{player['rating']:.1f}")
-                    st.metric("Age", player['age'])
-                
-                with col3:
-                    st.metric("Value", format_value(player['market_value']))
-                    st.metric("Minutes", f"{player['minutes_played']:,}")
-                
-                with col4:
-                    st.metric("Goals", player['goals'])
-                    st.metric("Assists", player['assists'])
-                
-                with col5:
-                    if st.button("👁️ View", key=f"view_{player['id']}"):
-                        st.session_state.selected_player = player['id']
-                        st.session_state.active_tab = "analytics"
-                    
-                    if st.button("⭐ Watch", key=f"watch_{player['id']}"):
-                        if player['id'] not in st.session_state.watchlist:
-                            st.session_state.watchlist.append(player['id'])
-                            st.success("Added!")
-                        else:
-                            st.info("Already watching")
-                
-                st.divider()
+        selected_rows = event.selection.rows
+        if selected_rows:
+            player = players_df.iloc[selected_rows[0]]
+            player_id = int(player['id'])
+            st.markdown(SOURCE_INDICATOR_HTML[codes[selected_rows[0]]], unsafe_allow_html=True)
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button(f"👁️ View {player['name']}"):
+                    st.session_state.selected_player = player_id
+                    st.session_state.active_tab = "analytics"
+            with col2:
+                if st.button("⭐ Add selected to watchlist"):
+                    if player_id not in st.session_state.watchlist:
+                        st.session_state.watchlist.append(player_id)
+                        # Rerun the whole app so the Watchlist tab picks up the new player
+                        st.session_state.watchlist_notice = "Added!"
+                        st.rerun(scope="app")
+                    else:
+                        st.info("Already watching")
+                if st.session_state.pop("watchlist_notice", None):
+                    st.success("Added!")
+        else:
+            st.caption("Select a row to view or watch a player")
+
+with tab1:
+    render_players_tab()
 
             # app.py (Part 3 of 6)
 # Teams and Watchlist tabs
 
 # Teams Tab
-with tab2:
+@st.fragment
+def render_teams_tab():
     st.subheader("Team Analysis")
     
-    # Get teams
-    conn = db_manager.get_connection()
-    teams_query = """
-        SELECT 
-            club as team_name,
-            league,
-            COUNT(*) as squad_size,
-            AVG(age) as avg_age,
-            AVG(rating) as avg_rating,
-            SUM(market_value) as total_value,
-            SUM(goals) as total_goals,
-            SUM(assists) as total_assists
-        FROM players
-        GROUP BY club, league
-        HAVING COUNT(*) >= 5
-        ORDER BY total_value DESC
-    """
-    teams_df = pd.read_sql_query(teams_query, conn)
-    conn.close()
-    
     # Filters
     col1, col2 = st.columns(2)
     with col1:
         team_league_filter = st.selectbox(
             "Filter by League",
-            ["All"] + teams_df['league'].unique().tolist()
+            ["All"] + load_team_leagues()
         )
     with col2:
-        sort_metric = st.selectbox(
-            "Sort by",
-            ["total_value", "avg_rating", "total_goals", "squad_size"]
-        )
-    
-    # Apply filters
-    if team_league_filter != "All":
-        teams_df = teams_df[teams_df['league'] == team_league_filter]
+        sort_metric = st.selectbox("Sort by", TEAM_SORT_COLUMNS)
     
-    teams_df = teams_df.sort_values(sort_metric, ascending=False)
+    teams_df = load_teams(team_league_filter, sort_metric)
     
     # Display teams
     for idx, team in teams_df.iterrows():
@@ -463,7 +715,7 @@ with tab2:
                 st.metric("Total Assists", int(team['total_assists']))
             
             with col4:
-                if st.button("📊 Full Analysis", key=f"analyze_team_{idx}"):
+                if st.button("📊 Full Analysis", key=f"analyze_team_{team['team_name']}_{team['league']}"):
                     team_analytics = analytics.get_team_analytics(
                         team['team_name'], 
                         team['league']
@@ -472,6 +724,7 @@ with tab2:
                     # Display team analytics
                     st.subheader("Position Distribution")
                     if 'position_distribution' in team_analytics:
+                        import plotly.express as px
                         fig = px.pie(
                             values=list(team_analytics['position_distribution'].values()),
                             names=list(team_analytics['position_distribution'].keys()),
@@ -485,24 +738,18 @@ with tab2:
                         top_df = pd.DataFrame(team_analytics['top_performers'])
                         st.dataframe(top_df, use_container_width=True)
 
+with tab2:
+    render_teams_tab()
+
 # Watchlist Tab
-with tab3:
+@st.fragment
+def render_watchlist_tab():
     st.subheader("⭐ Your Watchlist")
     
     if not st.session_state.watchlist:
         st.info("Your watchlist is empty. Add players from the Players tab.")
     else:
-        conn = db_manager.get_connection()
-        watchlist_query = f"""
-            SELECT * FROM players 
-            WHERE id IN ({','.join('?' * len(st.session_state.watchlist))})
-        """
-        watchlist_df = pd.read_sql_query(
-            watchlist_query, 
-            conn, 
-            params=st.session_state.watchlist
-        )
-        conn.close()
+        watchlist_df = load_watchlist(tuple(st.session_state.watchlist))
         
         # Summary metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -521,7 +768,7 @@ with tab3:
         
         # Format display
         display_df = watchlist_df[display_cols].copy()
-        display_df['market_value'] = display_df['market_value'].apply(format_value)
+        display_df['market_value'] = format_values(display_df['market_value'])
         
         st.dataframe(display_df, use_container_width=True)
         
@@ -539,13 +786,14 @@ with tab3:
         
         with col3:
             if st.button("📥 Export to Excel"):
-                output = BytesIO()
-                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                    watchlist_df.to_excel(writer, sheet_name='Watchlist', index=False)
-                    
-                    # Get the workbook and worksheet
-                    workbook = writer.book
-                    worksheet = writer.sheets['Watchlist']
+                import tempfile
+                import xlsxwriter
+                # constant_memory flushes each row to disk as it is written; xlsxwriter
+                # ignores it for in-memory workbooks, so write to a temp file instead
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    xlsx_path = os.path.join(tmp_dir, 'watchlist.xlsx')
+                    workbook = xlsxwriter.Workbook(xlsx_path, {'constant_memory': True})
+                    worksheet = workbook.add_worksheet('Watchlist')
                     
                     # Format header
                     header_format = workbook.add_format({
@@ -553,11 +801,16 @@ with tab3:
                         'bg_color': '#4CAF50',
                         'font_color': 'white'
                     })
+                    worksheet.write_row(0, 0, watchlist_df.columns.tolist(), header_format)
                     
-                    for col_num, value in enumerate(watchlist_df.columns.values):
-                        worksheet.write(0, col_num, value, header_format)
-                
-                output.seek(0)
+                    # Missing values become blank cells, as with to_excel
+                    rows = watchlist_df.astype(object).where(watchlist_df.notna(), None)
+                    for row_num, row in enumerate(rows.itertuples(index=False), start=1):
+                        worksheet.write_row(row_num, 0, row)
+                    workbook.close()
+                    
+                    with open(xlsx_path, 'rb') as f:
+                        output = f.read()
                 st.download_button(
                     label="Download Excel",
                     data=output,
@@ -577,23 +830,20 @@ with tab3:
                 # Radar chart
                 categories = ['Rating', 'Goals', 'Assists', 'Age', 'Minutes/100']
                 
-                fig = go.Figure()
+                # One (players x categories) matrix; age and minutes scaled to the rating range
+                values = np.column_stack([
+                    comparison_df['rating'].to_numpy(dtype=float),
+                    comparison_df['goals'].to_numpy(dtype=float),
+                    comparison_df['assists'].to_numpy(dtype=float),
+                    comparison_df['age'].to_numpy(dtype=float) / 5,
+                    comparison_df['minutes_played'].to_numpy(dtype=float) / 100
+                ])
                 
-                for idx, player in comparison_df.iterrows():
-                    values = [
-                        player['rating'],
-                        player['goals'],
-                        player['assists'],
-                        player['age'] / 5,  # Scale age
-                        player['minutes_played'] / 100
-                    ]
-                    
-                    fig.add_trace(go.Scatterpolar(
-                        r=values,
-                        theta=categories,
-                        fill='toself',
-                        name=player['name']
-                    ))
+                import plotly.graph_objects as go
+                fig = go.Figure(data=[
+                    go.Scatterpolar(r=row, theta=categories, fill='toself', name=name)
+                    for row, name in zip(values, comparison_df['name'])
+                ])
                 
                 fig.update_layout(
                     polar=dict(
@@ -608,27 +858,26 @@ with tab3:
                 
                 st.plotly_chart(fig, use_container_width=True)
 
+with tab3:
+    render_watchlist_tab()
+
                 # app.py (Part 4 of 6)
 # Analytics Tab
 
 # Analytics Tab
-with tab4:
+@st.fragment
+def render_analytics_tab():
     st.subheader("📈 Advanced Analytics")
     
-    # Player selection
-    conn = db_manager.get_connection()
-    all_players = pd.read_sql_query(
-        "SELECT id, name, club, league FROM players ORDER BY rating DESC",
-        conn
+    # Player selection - top-rated candidates, narrowed by the filter for the long tail
+    candidate_filter = st.text_input(
+        "Filter candidates",
+        placeholder="Player or club name...",
+        key="analytics_candidate_filter"
     )
-    conn.close()
+    player_options = load_all_players_for_analytics(candidate_filter.strip())
     
-    if not all_players.empty:
-        player_options = {
-            f"{p['name']} ({p['club']} - {p['league']})": p['id'] 
-            for _, p in all_players.iterrows()
-        }
-        
+    if player_options:
         selected_player_name = st.selectbox(
             "Select Player for Analysis",
             list(player_options.keys())
@@ -636,14 +885,20 @@ with tab4:
         selected_player_id = player_options[selected_player_name]
         
         if st.button("🔍 Analyze Player"):
-            # Get percentiles
-            percentiles = analytics.get_player_percentiles(selected_player_id)
+            # Percentiles and similar players come from one cohort pass
+            analysis = analyze_player(selected_player_id)
+            percentiles = analysis['percentiles']
             
             if percentiles:
                 st.subheader(f"Analysis for {percentiles['player_name']}")
                 
                 # Percentile chart
-                if 'percentiles' in percentiles:
+                if percentiles.get('insufficient_sample'):
+                    st.info(
+                        f"Only {percentiles['sample_size']} comparable players - "
+                        "not enough for percentile rankings"
+                    )
+                elif 'percentiles' in percentiles:
                     percentile_data = []
                     for metric, data in percentiles['percentiles'].items():
                         percentile_data.append({
@@ -654,6 +909,7 @@ with tab4:
                     
                     df_percentiles = pd.DataFrame(percentile_data)
                     
+                    import plotly.express as px
                     fig = px.bar(
                         df_percentiles,
                         x='Metric',
@@ -679,7 +935,7 @@ with tab4:
                 
                 # Similar players
                 st.subheader("Similar Players")
-                similar_players = analytics.find_similar_players(selected_player_id, num_similar=8)
+                similar_players = analysis['similar']
                 
                 if similar_players:
                     similar_df = pd.DataFrame(similar_players)
@@ -687,15 +943,21 @@ with tab4:
                     # Format for display
                     display_similar = similar_df[['name', 'club', 'league', 'age', 
                                                  'rating', 'similarity_score']].copy()
-                    display_similar['market_value'] = similar_df['market_value'].apply(format_value)
+                    display_similar['market_value'] = format_values(similar_df['market_value'])
                     
                     st.dataframe(display_similar, use_container_width=True)
+    elif candidate_filter:
+        st.info("No players match that filter")
+
+with tab4:
+    render_analytics_tab()
 
                     # app.py (Part 5 of 6)
 # Reports Tab
 
 # Reports Tab
-with tab5:
+@st.fragment
+def render_reports_tab():
     st.subheader("📄 Scouting Reports")
     
     report_type = st.selectbox(
@@ -706,19 +968,9 @@ with tab5:
     
     if report_type == "Player Scouting Report":
         # Player selection
-        conn = db_manager.get_connection()
-        report_players = pd.read_sql_query(
-            "SELECT id, name, club, league FROM players WHERE rating > 6.5 ORDER BY rating DESC",
-            conn
-        )
-        conn.close()
+        player_select = load_report_players()
         
-        if not report_players.empty:
-            player_select = {
-                f"{p['name']} ({p['club']})": p['id']
-                for _, p in report_players.iterrows()
-            }
-            
+        if player_select:
             selected_for_report = st.selectbox(
                 "Select Player",
                 list(player_select.keys())
@@ -726,9 +978,7 @@ with tab5:
             
             if st.button("📄 Generate Report"):
                 with st.spinner("Generating comprehensive scouting report..."):
-                    report = analytics.generate_player_report(
-                        player_select[selected_for_report]
-                    )
+                    report = build_report(player_select[selected_for_report])
                     
                     if report:
                         # Player header
@@ -753,12 +1003,12 @@ with tab5:
                         with col1:
                             st.markdown("### ✅ Strengths")
                             for strength in report['strengths']:
-                                st.write(f"• {strength['description']}")
+                                st.write(f"• {strength['metric']} ({strength['percentile']:.1f}%ile)")
                         
                         with col2:
                             st.markdown("### ⚠️ Areas for Improvement")
                             for weakness in report['weaknesses']:
-                                st.write(f"• {weakness['description']}")
+                                st.write(f"• {weakness['metric']} ({weakness['percentile']:.1f}%ile)")
                         
                         # Recommendation
                         st.markdown("### 🎯 Scouting Recommendation")
@@ -787,31 +1037,7 @@ with tab5:
                         st.markdown("### 📥 Export Report")
                         
                         # Create downloadable report
-                        report_text = f"""
-PLAYER SCOUTING REPORT
-Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}
-
-PLAYER: {player_info['name']}
-Position: {player_info['position']}
-Club: {player_info['club']}
-League: {player_info['league']}
-Age: {player_info['age']}
-Market Value: {format_value(player_info['market_value'])}
-
-PERFORMANCE METRICS
-Rating: {player_info['rating']}
-Goals: {player_info['goals']}
-Assists: {player_info['assists']}
-Minutes: {player_info['minutes_played']}
-
-RECOMMENDATION
-{rec['overall_assessment']}
-Suggested Action: {rec['suggested_action']}
-
-VALUE ASSESSMENT
-Current Value: {format_value(value['current_value'])}
-Assessment: {value['value_rating']}
-Projection: {value['projection']}
+                        report_text = build_report_text(player_select[selected_for_report])
                         st.download_button(
                             label="Download Text Report",
                             data=report_text,
@@ -822,8 +1048,8 @@ Projection: {value['projection']}
     elif report_type == "Data Coverage Report":
         st.subheader("Data Source Coverage by League")
         
-        for league in ["MLS", "USL Championship", "USL League One"]:
-            coverage = aggregator.get_data_coverage_report(league)
+        coverage_reports = load_coverage_reports(("MLS", "USL Championship", "USL League One"))
+        for league, coverage in coverage_reports.items():
             
             if coverage:
                 st.markdown(f"### {league}")
@@ -844,11 +1070,15 @@ Projection: {value['projection']}
                 
                 st.divider()
 
+with tab5:
+    render_reports_tab()
+
                 # app.py (Part 6 of 6)
 # Search Tab and Footer
 
 # Search Tab
-with tab6:
+@st.fragment
+def render_search_tab():
     st.subheader("🔍 Advanced Search")
     
     search_query = st.text_area(
@@ -859,28 +1089,29 @@ with tab6:
     
     if st.button("Execute Search"):
         try:
-            # Build safe query (in production, use proper SQL sanitization)
-            conn = db_manager.get_connection()
+            conn = get_sqlite()
             
-            # Base query with user conditions
-            full_query = f"SELECT * FROM players WHERE {search_query}"
+            # Only allowlisted columns/keywords reach SQL; literals are bound as
+            # parameters so repeated searches reuse the cached prepared statement
+            predicate, params = build_search_predicate(search_query)
+            full_query = (
+                f"SELECT {', '.join(SEARCH_RESULT_COLUMNS)} FROM players WHERE {predicate}"
+            )
             
-            results_df = pd.read_sql_query(full_query, conn)
-            conn.close()
+            results_df = pd.read_sql_query(full_query, conn, params=params, dtype_backend='pyarrow')
             
             st.success(f"Found {len(results_df)} players")
             
             if not results_df.empty:
                 # Display results
-                display_cols = ['name', 'position', 'club', 'league', 'age', 
-                              'rating', 'market_value', 'goals', 'assists']
-                st.dataframe(results_df[display_cols], use_container_width=True)
+                st.dataframe(results_df, use_container_width=True)
                 
-                # Export option
-                csv = results_df.to_csv(index=False)
+                # Export option - encoded straight into a buffer in chunks
+                csv_buffer = BytesIO()
+                results_df.to_csv(csv_buffer, index=False, chunksize=10000, encoding='utf-8')
                 st.download_button(
                     label="Download Results as CSV",
-                    data=csv,
+                    data=csv_buffer.getvalue(),
                     file_name=f"search_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                     mime="text/csv"
                 )
@@ -889,6 +1120,9 @@ with tab6:
             st.error(f"Search error: {str(e)}")
             st.info("Please check your search syntax")
 
+with tab6:
+    render_search_tab()
+
 # Footer
 st.divider()
 st.markdown("""
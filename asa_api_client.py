@@ -1,5 +1,6 @@
 import requests
 import json
+import pandas as pd
 import time
 import logging
 
@@ -9,8 +10,60 @@ from typing import List, Dict, Optional, Any
 from scrapers.base_scraper import BaseScraper
 from config import Config
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson is optional; the stdlib parser accepts bytes too
+    _loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+# ASA response field -> player record field, in record order
+PLAYER_FIELDS = {
+    "player_name": "name",
+    "player_id": "asa_id",
+    "team_name": "team",
+    "season": "season",
+    "minutes_played": "minutes_played",
+    "shots": "shots",
+    "xg": "xg",
+    "goals": "goals",
+    "xg_per_shot": "xg_per_shot",
+    "key_passes": "key_passes",
+    "xa": "xa",
+    "assists": "assists",
+    "xg_buildup": "xgbuildup",
+    "xg_chain": "xgchain",
+}
+
+# ASA xPass response field -> player record field, in record order
+XPASS_FIELDS = {
+    "player_name": "name",
+    "player_id": "asa_id",
+    "team_name": "team",
+    "xa": "xa",
+    "key_passes": "key_passes",
+    "pass_completion_percentage": "pass_completion",
+}
+
+# Values used when the API omits a numeric field
+PLAYER_DEFAULTS = {
+    "minutes_played": 0,
+    "shots": 0,
+    "xg": 0.0,
+    "goals": 0,
+    "xg_per_shot": 0.0,
+    "key_passes": 0,
+    "xa": 0.0,
+    "assists": 0,
+    "xgbuildup": 0.0,
+    "xgchain": 0.0,
+}
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Convert a frame to record dicts with missing values as None"""
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
 class AmericanSoccerAnalysisAPI(BaseScraper):
     """Client for American Soccer Analysis API"""
 
@@ -52,40 +105,24 @@ class AmericanSoccerAnalysisAPI(BaseScraper):
 
     def parse_player_data(self, response_data: Dict[str, Any], league: str) -> List[Dict[str, Any]]:
         """Parse player data from API response"""
-        players_data: List[Dict[str, Any]] = []
-
         data_list = response_data.get("data", [])
-        for player in data_list:
-            player_data: Dict[str, Any] = {
-                "name": player.get("player_name"),
-                "asa_id": player.get("player_id"),
-                "team": player.get("team_name"),
-                "league": league,
-                "season": player.get("season"),
-                "minutes_played": player.get("minutes_played", 0),
-                "shots": player.get("shots", 0),
-                "xg": player.get("xg", 0.0),
-                "goals": player.get("goals", 0),
-                "xg_per_shot": player.get("xg_per_shot", 0.0),
-                "key_passes": player.get("key_passes", 0),
-                "xa": player.get("xa", 0.0),
-                "assists": player.get("assists", 0),
-                "xgbuildup": player.get("xg_buildup", 0.0),
-                "xgchain": player.get("xg_chain", 0.0),
-                "source": "asa"
-            }
-
-            # Calculate per 90 stats
-            minutes = player_data["minutes_played"]
-            if minutes > 0:
-                mins90 = minutes / 90.0
-                player_data["xg_per_90"] = round(player_data["xg"] / mins90, 2)
-                player_data["xa_per_90"] = round(player_data["xa"] / mins90, 2)
-                player_data["shots_per_90"] = round(player_data["shots"] / mins90, 2)
-
-            players_data.append(player_data)
-
-        return players_data
+        if not data_list:
+            return []
+
+        # Object dtype keeps identifiers and seasons exactly as the API sent them
+        df = pd.DataFrame(data_list, dtype=object).reindex(columns=list(PLAYER_FIELDS)).rename(columns=PLAYER_FIELDS)
+        for col, default in PLAYER_DEFAULTS.items():
+            df[col] = pd.to_numeric(df[col].fillna(default), downcast="integer" if isinstance(default, int) else None)
+        df.insert(df.columns.get_loc("season"), "league", league)
+        df["source"] = "asa"
+
+        # Calculate per 90 stats, leaving them empty for players without minutes
+        played = df["minutes_played"] > 0
+        mins90 = df["minutes_played"] / 90.0
+        for col, stat in (("xg_per_90", "xg"), ("xa_per_90", "xa"), ("shots_per_90", "shots")):
+            df[col] = (df[stat] / mins90).round(2).where(played)
+
+        return _records(df)
 
     def _fetch_xg_data(self, league_code: str, season: int) -> List[Dict[str, Any]]:
         """Fetch expected goals data"""
@@ -98,10 +135,10 @@ class AmericanSoccerAnalysisAPI(BaseScraper):
         }
 
         try:
-            response = self.session.get(endpoint, params=params)
+            response = self.session.get(endpoint, params=params, timeout=self.config.REQUEST_TIMEOUT_SECONDS)
             response.raise_for_status()
-            return self.parse_player_data(response.json(), league_code)
-        except requests.RequestException as e:
+            return self.parse_player_data(_loads(response.content), league_code)
+        except (requests.RequestException, ValueError) as e:
             logger.error(f"Error fetching xG data from ASA: {e}")
             return []
 
@@ -116,11 +153,11 @@ class AmericanSoccerAnalysisAPI(BaseScraper):
         }
 
         try:
-            response = self.session.get(endpoint, params=params)
+            response = self.session.get(endpoint, params=params, timeout=self.config.REQUEST_TIMEOUT_SECONDS)
             response.raise_for_status()
-            data = response.json()
+            data = _loads(response.content)
             return data.get("data", [])
-        except requests.RequestException as e:
+        except (requests.RequestException, ValueError) as e:
             logger.error(f"Error fetching xPass data from ASA: {e}")
             return []
 
@@ -131,36 +168,37 @@ class AmericanSoccerAnalysisAPI(BaseScraper):
         league: str
     ) -> List[Dict[str, Any]]:
         """Merge different ASA data sources"""
-        merged: Dict[Any, Dict[str, Any]] = {}
-
         # Start with xG data
-        for player in xg_data:
-            pid = player.get("asa_id")
-            if pid:
-                merged[pid] = player
-
-        # Merge xPass data
-        for player in xpass_data:
-            pid = player.get("player_id")
-            if pid in merged:
-                merged[pid].update({
-                    "xa": player.get("xa", 0.0),
-                    "key_passes": player.get("key_passes", 0),
-                    "pass_completion": player.get("pass_completion_percentage", 0.0)
-                })
-            else:
-                merged[pid] = {
-                    "name": player.get("player_name"),
-                    "asa_id": pid,
-                    "team": player.get("team_name"),
-                    "league": league,
-                    "xa": player.get("xa", 0.0),
-                    "key_passes": player.get("key_passes", 0),
-                    "pass_completion": player.get("pass_completion_percentage", 0.0),
-                    "source": "asa"
-                }
-
-        return list(merged.values())
+        xg = pd.DataFrame(xg_data, dtype=object)
+        if "asa_id" not in xg:
+            xg["asa_id"] = pd.Series(dtype=object)
+        xg = xg[xg["asa_id"].astype(bool)].drop_duplicates("asa_id", keep="last")
+
+        xpass = (
+            pd.DataFrame(xpass_data, dtype=object)
+            .reindex(columns=list(XPASS_FIELDS))
+            .astype(object)
+            .rename(columns=XPASS_FIELDS)
+        )
+        xpass = xpass.fillna({"xa": 0.0, "key_passes": 0, "pass_completion": 0.0})
+        xpass = xpass.drop_duplicates("asa_id", keep="last")
+        matched = xpass["asa_id"].isin(xg["asa_id"])
+
+        # xPass values replace the xG feed's for players present in both
+        merged = xg.merge(
+            xpass.loc[matched, ["asa_id", "xa", "key_passes", "pass_completion"]],
+            on="asa_id", how="left", suffixes=("", "_xpass")
+        )
+        for col in ("xa", "key_passes", "pass_completion"):
+            if col in xg:
+                merged[col] = merged.pop(f"{col}_xpass").combine_first(merged[col])
+
+        # Players only present in the xPass feed
+        extra = xpass.loc[~matched]
+        extra.insert(3, "league", league)
+        extra = extra.assign(source="asa")
+
+        return _records(merged) + _records(extra)
 
     def get_team_xg_timeline(self, team_name: str, season: int) -> List[Dict[str, Any]]:
         """Get team's xG timeline for a season"""
@@ -168,9 +206,9 @@ class AmericanSoccerAnalysisAPI(BaseScraper):
         params = {"team_name": team_name, "season": season}
 
         try:
-            response = self.session.get(endpoint, params=params)
+            response = self.session.get(endpoint, params=params, timeout=self.config.REQUEST_TIMEOUT_SECONDS)
             response.raise_for_status()
-            return response.json().get("data", [])
-        except requests.RequestException as e:
+            return _loads(response.content).get("data", [])
+        except (requests.RequestException, ValueError) as e:
             logger.error(f"Error fetching team xG timeline: {e}")
             return []
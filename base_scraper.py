@@ -1,8 +1,14 @@
+import codecs
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
 import time
+import threading
 import logging
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Sequence, Tuple, Union
+from urllib.parse import urlparse
 from bs4 import BeautifulSoup
 
 from database_manager import DatabaseManager
@@ -12,44 +18,181 @@ from config import Config
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Buffered cache entries written per transaction
+CACHE_FLUSH_SIZE = 25
+
+# Transient statuses retried on the pooled connection before giving up
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Text helpers shared by every scraper's parsers, including the module-level
+# ones that run without a scraper instance
+def clean_text(text: str) -> str:
+    """Collapse runs of whitespace and trim"""
+    # split()/join() is one C pass per string; it beats a \s+ regex, and unlike
+    # deleting characters with str.translate it keeps words around a newline apart
+    return ' '.join(text.split())
+
+def parse_number(text: str, default: int = 0) -> int:
+    """Parse integer from the digits in text, return default if there are none"""
+    try:
+        # Most cells are already bare integers; otherwise keep only the digits
+        if text.isdigit():
+            return int(text)
+        digits = ''.join(filter(str.isdigit, text))
+        return int(digits) if digits else default
+    except Exception:
+        return default
+
+def parse_float(text: str, default: float = 0.0) -> float:
+    """Parse float from text (handles '%' and commas), return default on failure"""
+    try:
+        return float(text.replace('%', '').replace(',', '.'))
+    except Exception:
+        return default
+
+def _utf8_body(response: requests.Response) -> bytes:
+    """Response body as UTF-8 bytes, reusing the raw content when it already is UTF-8"""
+    encoding = response.encoding or response.apparent_encoding
+    try:
+        if encoding and codecs.lookup(encoding).name == 'utf-8':
+            return response.content
+    except LookupError:
+        pass
+    return response.text.encode()
+
+
+class HostRateLimiter:
+    """Thread-safe limiter spacing requests to each host a fixed interval apart"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_slot: Dict[str, float] = {}
+
+    def wait(self, host: str, interval: float) -> None:
+        """Block until the next request slot for host is due"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
 class BaseScraper(ABC):
     """Base class for all scrapers"""
 
+    # Shared by every scraper so concurrent syncs still respect each host's limit
+    rate_limiter = HostRateLimiter()
+
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
         self.config = Config()
         self.session = requests.Session()
         self.session.headers.update(self.config.DEFAULT_HEADERS)
+        # Only advertise compressions urllib3 can decode here (br needs brotli),
+        # or responses come back as undecodable bytes
+        self.session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        # Keep connections alive per host so repeated page fetches skip the TCP/TLS handshake
+        retry = Retry(
+            total=self.config.HTTP_MAX_RETRIES,
+            backoff_factor=self.config.HTTP_RETRY_BACKOFF_SECONDS,
+            status_forcelist=RETRY_STATUS_CODES,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.config.HTTP_POOL_MAXSIZE, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # Fetched pages (text or UTF-8 bytes, with their TTL) waiting to be
+        # written to the cache in one transaction
+        self._pending_cache: Dict[str, Tuple[Union[str, bytes], int]] = {}
+        self._cache_lock = threading.Lock()
+
+    def close(self) -> None:
+        """Flush pending cache writes and close pooled HTTP connections"""
+        self.flush_cache()
+        self.session.close()
+
+    def flush_cache(self) -> None:
+        """Write buffered responses to the cache table"""
+        # Swap the buffer out so other threads can keep fetching while it is written
+        with self._cache_lock:
+            pending, self._pending_cache = self._pending_cache, {}
+        if pending:
+            self.db.cache_set_many([(url, value, ttl) for url, (value, ttl) in pending.items()])
 
     @abstractmethod
-    def scrape_league(self, league: str) -> List[Dict[str, Any]]:
-        """Scrape data for a specific league"""
+    def scrape_league(self, league: str) -> Sequence[Any]:
+        """Scrape data for a specific league; returns records as parse_player_data does"""
         ...
 
     @abstractmethod
-    def parse_player_data(self, html: str, league: str) -> List[Dict[str, Any]]:
-        """Parse player data from HTML"""
+    def parse_player_data(self, html: str, league: str) -> Sequence[Any]:
+        """Parse player data from HTML into one record per player. A record is
+        a dict keyed by player field or a slotted dataclass with those fields as
+        attributes (e.g. Transfermarkt's PlayerRow); a subclass may also offer a
+        columnar form such as a pyarrow RecordBatch behind an opt-in flag"""
         ...
 
-    def make_request(self, url: str, use_cache: bool = True) -> Optional[str]:
-        """Make HTTP request with caching and rate limiting"""
-        if use_cache:
-            cached = self.db.cache_get(url)
+    def make_request(
+        self,
+        url: str,
+        use_cache: bool = True,
+        force_refresh: bool = False,
+        ttl_seconds: Optional[int] = None
+    ) -> Optional[str]:
+        """Make HTTP request with caching and rate limiting; force_refresh skips the
+        cached copy but still stores the new one, ttl_seconds overrides CACHE_TTL_SECONDS"""
+        return self._request(url, use_cache, force_refresh, ttl_seconds, as_bytes=False)
+
+    def make_request_bytes(
+        self,
+        url: str,
+        use_cache: bool = True,
+        force_refresh: bool = False,
+        ttl_seconds: Optional[int] = None
+    ) -> Optional[bytes]:
+        """Like make_request, but return the page as UTF-8 bytes for parsers that
+        take bytes, skipping the decode to str"""
+        return self._request(url, use_cache, force_refresh, ttl_seconds, as_bytes=True)
+
+    def _request(
+        self,
+        url: str,
+        use_cache: bool,
+        force_refresh: bool,
+        ttl_seconds: Optional[int],
+        as_bytes: bool
+    ) -> Optional[Union[str, bytes]]:
+        """Fetch a page as text or UTF-8 bytes, through the cache"""
+        if use_cache and not force_refresh:
+            pending = self._pending_cache.get(url)
+            cached = pending[0] if pending else self.db.cache_get(url, as_bytes=as_bytes)
             if cached:
+                # A pending entry may have been fetched in the other form
+                if as_bytes and isinstance(cached, str):
+                    cached = cached.encode()
+                elif not as_bytes and isinstance(cached, bytes):
+                    cached = cached.decode(errors='replace')
                 logger.info(f"Using cached data for {url}")
                 return cached
 
-        time.sleep(self.config.RATE_LIMIT_DELAY_SECONDS)
+        self.rate_limiter.wait(urlparse(url).netloc, self.config.RATE_LIMIT_DELAY_SECONDS)
 
         try:
             response = self.session.get(url, timeout=self.config.REQUEST_TIMEOUT_SECONDS)
             response.raise_for_status()
+            body = _utf8_body(response) if as_bytes else response.text
 
             if use_cache:
-                self.db.cache_set(url, response.text, ttl_seconds=self.config.CACHE_TTL_SECONDS)
+                with self._cache_lock:
+                    ttl = self.config.CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+                    self._pending_cache[url] = (body, ttl)
+                    full = len(self._pending_cache) >= CACHE_FLUSH_SIZE
+                if full:
+                    self.flush_cache()
 
             logger.info(f"Successfully fetched {url}")
-            return response.text
+            return body
 
         except requests.RequestException as e:
             logger.error(f"Error fetching {url}: {e}")
@@ -57,21 +200,12 @@ class BaseScraper(ABC):
 
     def clean_text(self, text: str) -> str:
         """Clean and normalize text"""
-        # collapse whitespace and remove newlines/tabs
-        return ' '.join(text.split())
+        return clean_text(text)
 
     def parse_number(self, text: str, default: int = 0) -> int:
         """Parse integer from text, return default on failure"""
-        try:
-            cleaned = ''.join(ch for ch in text if ch.isdigit())
-            return int(cleaned) if cleaned else default
-        except Exception:
-            return default
+        return parse_number(text, default)
 
     def parse_float(self, text: str, default: float = 0.0) -> float:
         """Parse float from text (handles '%' and commas), return default on failure"""
-        try:
-            cleaned = text.replace('%', '').replace(',', '.')
-            return float(cleaned)
-        except Exception:
-            return default
+        return parse_float(text, default)
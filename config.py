@@ -1,6 +1,7 @@
 import os
 import logging
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Dict, Any, Mapping
 
 from dotenv import load_dotenv
 
@@ -11,6 +12,8 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_NO_LEAGUE_CONFIG: Mapping[str, Any] = MappingProxyType({})
+
 class Config:
     """Application configuration"""
 
@@ -28,36 +31,43 @@ class Config:
     CACHE_TTL_SECONDS: int = CACHE_TTL_HOURS * 3600
     MAX_CACHE_SIZE_MB: int = int(os.getenv("MAX_CACHE_SIZE_MB", "100"))
 
+    # Analytics Settings
+    MIN_MINUTES: int = int(os.getenv("MIN_MINUTES", "900"))
+    MIN_COHORT_SIZE: int = int(os.getenv("MIN_COHORT_SIZE", "5"))
+
     # Scraping Settings
     RATE_LIMIT_DELAY_SECONDS: float = float(os.getenv("RATE_LIMIT_DELAY_SECONDS", "2"))
     MAX_CONCURRENT_REQUESTS: int = int(os.getenv("MAX_CONCURRENT_REQUESTS", "3"))
     REQUEST_TIMEOUT_SECONDS: int = int(os.getenv("REQUEST_TIMEOUT_SECONDS", "30"))
+    HTTP_POOL_MAXSIZE: int = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+    HTTP_MAX_RETRIES: int = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+    HTTP_RETRY_BACKOFF_SECONDS: float = float(os.getenv("HTTP_RETRY_BACKOFF_SECONDS", "0.5"))
 
     # Chrome Driver Settings
     CHROME_HEADLESS: bool = os.getenv("CHROME_HEADLESS", "true").lower() == "true"
     CHROME_NO_SANDBOX: bool = os.getenv("CHROME_NO_SANDBOX", "true").lower() == "true"
 
-    # League URLs and IDs
-    LEAGUE_CONFIG: Dict[str, Dict[str, Any]] = {
-        "MLS": {
+    # League URLs and IDs (read-only, so lookups can share the entries)
+    LEAGUE_CONFIG: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+        "MLS": MappingProxyType({
             "fbref_url": "/en/comps/22/Major-League-Soccer-Stats",
             "transfermarkt_id": "major-league-soccer/startseite/wettbewerb/MLS1",
             "sofascore_id": "242",
             "asa_league_code": "mls",
-        },
-        "USL Championship": {
+        }),
+        "USL Championship": MappingProxyType({
             "fbref_url": "/en/comps/123/USL-Championship-Stats",
             "transfermarkt_id": "usl-championship/startseite/wettbewerb/USC",
             "sofascore_id": "256",
             "asa_league_code": "uslc",
-        },
-        "USL League One": {
+        }),
+        "USL League One": MappingProxyType({
             "fbref_url": "/en/comps/124/USL-League-One-Stats",
             "transfermarkt_id": "usl-league-one/startseite/wettbewerb/USL1",
             "sofascore_id": "257",
             "asa_league_code": "usl1",
-        },
-    }
+        }),
+    })
 
     # Request Headers
     DEFAULT_HEADERS: Dict[str, str] = {
@@ -78,9 +88,9 @@ class Config:
     MAX_EXPORT_ROWS: int = int(os.getenv("MAX_EXPORT_ROWS", "10000"))
 
     @classmethod
-    def get_league_config(cls, league: str) -> Dict[str, Any]:
+    def get_league_config(cls, league: str) -> Mapping[str, Any]:
         """Get configuration for a specific league"""
-        return cls.LEAGUE_CONFIG.get(league, {})
+        return cls.LEAGUE_CONFIG.get(league, _NO_LEAGUE_CONFIG)
 
     @classmethod
     def validate_config(cls) -> bool:
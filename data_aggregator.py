@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import hashlib
+import json
 import logging
 from typing import List, Dict, Optional, Tuple, Any
 from datetime import datetime
@@ -18,9 +19,32 @@ from scrapers.asa_api_client import AmericanSoccerAnalysisAPI
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Python types sqlite3 can bind without an adapter
+SQLITE_VALUE_TYPES = (int, float, str, bytes)
+
+# A save only drops and rebuilds the player indexes (bulk_load) when it
+# writes at least this share of the table; smaller saves upsert in place
+BULK_LOAD_MIN_SHARE = 0.5
+
 class DataAggregator:
     """Aggregates data from multiple sources and manages synchronization"""
 
+    # (id column, source label) pairs reported in data coverage
+    COVERAGE_SOURCES = [
+        ('fbref_id', 'FBref'),
+        ('transfermarkt_id', 'Transfermarkt'),
+        ('sofascore_id', 'Sofascore'),
+        ('asa_id', 'ASA')
+    ]
+
+    # Merge rules for combining one player's rows across sources
+    MERGE_FIRST_FIELDS = [
+        'name', 'age', 'position', 'club', 'nationality', 'goals', 'assists',
+        'matches', 'minutes_played', 'yellow_cards', 'red_cards'
+    ]
+    MERGE_ID_FIELDS = ['fbref_id', 'transfermarkt_id', 'sofascore_id', 'asa_id']
+    MERGE_LAST_FIELDS = ['xg', 'xa', 'xg_per_90', 'xa_per_90', 'key_passes', 'dribbles']
+
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
         self.config = Config()
@@ -37,7 +61,7 @@ class DataAggregator:
         progress_callback: Optional[Any] = None
     ) -> Dict[str, Any]:
         """Synchronize all data sources for a league"""
-        sync_id = self.db.log_sync(league, 'all', 'started')
+        self.db.log_sync(league, 'all', 'started')
         results: Dict[str, Any] = {
             'league': league,
             'started_at': datetime.now(),
@@ -50,41 +74,28 @@ class DataAggregator:
             if progress_callback:
                 progress_callback(0.1, f"Starting sync for {league}")
 
-            # Fetch data concurrently
-            with ThreadPoolExecutor(max_workers=self.config.MAX_CONCURRENT_REQUESTS) as executor:
-                futures: Dict[str, Any] = {}
-
-                futures['fbref'] = executor.submit(
-                    self._fetch_with_error_handling,
-                    self.fbref.scrape_league,
-                    league,
-                    'FBref'
-                )
-                futures['transfermarkt'] = executor.submit(
-                    self._fetch_with_error_handling,
-                    self.transfermarkt.scrape_league,
-                    league,
-                    'Transfermarkt'
-                )
-                futures['sofascore'] = executor.submit(
-                    self._fetch_with_error_handling,
-                    self.sofascore.scrape_league,
-                    league,
-                    'Sofascore'
-                )
-                if self.asa:
-                    futures['asa'] = executor.submit(
-                        self._fetch_with_error_handling,
-                        self.asa.scrape_league,
-                        league,
-                        'ASA'
-                    )
+            scrapers = [
+                ('fbref', self.fbref.scrape_league, 'FBref'),
+                ('transfermarkt', self.transfermarkt.scrape_league, 'Transfermarkt'),
+                ('sofascore', self.sofascore.scrape_league, 'Sofascore')
+            ]
+            if self.asa:
+                scrapers.append(('asa', self.asa.scrape_league, 'ASA'))
+
+            # Fetch data concurrently - one worker per source so no scraper waits
+            # on another's network latency
+            with ThreadPoolExecutor(max_workers=len(scrapers)) as executor:
+                futures = {
+                    executor.submit(self._fetch_with_error_handling, fetch, league, name): source
+                    for source, fetch, name in scrapers
+                }
 
                 source_data: Dict[str, List[Dict[str, Any]]] = {}
                 completed = 0
                 total_sources = len(futures)
 
-                for source, future in futures.items():
+                for future in as_completed(futures):
+                    source = futures[future]
                     data, error = future.result()
                     source_data[source] = data
 
@@ -98,9 +109,16 @@ class DataAggregator:
                         progress = 0.1 + (0.6 * completed / total_sources)
                         progress_callback(progress, f"Fetched {source} data")
 
+            # Scrapers buffer fetched pages; persist them in one write per source
+            for scraper in (self.fbref, self.transfermarkt, self.sofascore, self.asa):
+                if scraper:
+                    scraper.flush_cache()
+
             if progress_callback:
                 progress_callback(0.7, "Merging data from all sources")
 
+            # Merge in a fixed source order; completion order varies between runs
+            source_data = {source: source_data[source] for source, _, _ in scrapers}
             merged_players = self._merge_player_data(source_data, league)
             results['total_players'] = len(merged_players)
 
@@ -127,6 +145,28 @@ class DataAggregator:
 
         return results
 
+    def sync_leagues(
+        self,
+        leagues: List[str],
+        progress_callback: Optional[Any] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Synchronize several leagues concurrently"""
+        if not leagues:
+            return {}
+
+        # Syncs are network-bound, so leagues overlap their request waits;
+        # per-host rate limits are still shared through the scrapers
+        results: Dict[str, Dict[str, Any]] = {}
+        with ThreadPoolExecutor(max_workers=min(self.config.MAX_CONCURRENT_REQUESTS, len(leagues))) as executor:
+            futures = {executor.submit(self.sync_league_data, league): league for league in leagues}
+            for completed, future in enumerate(as_completed(futures), 1):
+                league = futures[future]
+                results[league] = future.result()
+                if progress_callback:
+                    progress_callback(completed / len(futures), f"Synced {league}")
+
+        return {league: results[league] for league in leagues}
+
     def _fetch_with_error_handling(
         self,
         fetch_func: Any,
@@ -149,129 +189,114 @@ class DataAggregator:
         league: str
     ) -> List[Dict[str, Any]]:
         """Merge player data from different sources"""
-        merged_players: Dict[str, Dict[str, Any]] = {}
-
-        for source, players in source_data.items():
-            for player in players:
-                key = self._generate_player_key(player.get('name', ''), player.get('club', ''))
-                if key not in merged_players:
-                    merged_players[key] = {
-                        'league': league,
-                        'sources': {},
-                        'last_updated': datetime.now()
-                    }
-                self._merge_player_info(merged_players[key], player, source)
-
-        final_list: List[Dict[str, Any]] = []
-        for pdata in merged_players.values():
-            if 'rating' not in pdata and pdata['sources']:
-                ratings = [s['rating'] for s in pdata['sources'].values() if s.get('rating')]
-                if ratings:
-                    pdata['rating'] = round(sum(ratings) / len(ratings), 1)
-            final_list.append(pdata)
-
-        return final_list
-
-    def _generate_player_key(self, name: str, club: str) -> str:
-        """Generate unique key for player matching"""
-        n = name.lower().strip().split()
-        key_name = f"{n[0]}_{n[-1]}" if len(n) > 1 else n[0]
-        return f"{key_name}_{club.lower().strip()}"
-
-    def _merge_player_info(
-        self,
-        merged: Dict[str, Any],
-        new_data: Dict[str, Any],
-        source: str
-    ) -> None:
-        """Merge new player data into existing record"""
-        merged['sources'][source] = new_data
-
-        fields = [
-            'name', 'age', 'position', 'club', 'nationality', 'market_value',
-            'rating', 'goals', 'assists', 'matches', 'minutes_played',
-            'yellow_cards', 'red_cards'
+        frames = [pd.DataFrame(players, dtype=object) for players in source_data.values() if players]
+        if not frames:
+            return []
+        columns = ['name', 'club', 'rating', 'market_value', *self.MERGE_FIRST_FIELDS,
+                   *self.MERGE_ID_FIELDS, *self.MERGE_LAST_FIELDS]
+        df = pd.concat(frames, ignore_index=True).reindex(columns=list(dict.fromkeys(columns))).astype(object)
+
+        # Match on first/last name plus club; rows keep source order within each player
+        parts = df['name'].fillna('').str.casefold().str.split()
+        key_name = parts.str[0].where(parts.str.len() < 2, parts.str[0] + '_' + parts.str[-1])
+        key = key_name + '\x00' + df['club'].fillna('').str.casefold().str.strip()
+        codes, uniques = pd.factorize(key)
+        valid = codes >= 0
+        df, codes = df[valid], codes[valid]
+        groups = df.groupby(codes, sort=True)
+
+        merged = pd.DataFrame({'league': league, 'last_updated': datetime.now()}, index=range(len(uniques)))
+        # First non-null value wins for profile fields, last one for ids and advanced stats
+        merged = merged.join(groups[self.MERGE_FIRST_FIELDS].first())
+        ids = df[self.MERGE_ID_FIELDS]
+        merged = merged.join(ids.where(ids.notna() & ids.astype(bool)).groupby(codes).last())
+        merged = merged.join(groups[self.MERGE_LAST_FIELDS].last())
+        merged['market_value'] = pd.to_numeric(df['market_value'], errors='coerce').groupby(codes).max()
+        merged['rating'] = self._merge_ratings(pd.to_numeric(df['rating'], errors='coerce'), codes, len(uniques))
+
+        return [
+            {f: v for f, v in record.items() if v is not None}
+            for record in merged.astype(object).where(merged.notna(), None).to_dict('records')
         ]
-        for f in fields:
-            if f in new_data and new_data[f] is not None:
-                if f == 'market_value' and f in merged:
-                    merged[f] = max(merged.get(f, 0), new_data[f])
-                elif f == 'rating' and f in merged:
-                    merged[f] = round((merged.get(f, 0) + new_data[f]) / 2, 1)
-                else:
-                    if f not in merged or merged[f] is None:
-                        merged[f] = new_data[f]
-
-        for idf in ['fbref_id', 'transfermarkt_id', 'sofascore_id', 'asa_id']:
-            if idf in new_data and new_data[idf]:
-                merged[idf] = new_data[idf]
-
-        stats = ['xg', 'xa', 'xg_per_90', 'xa_per_90', 'key_passes', 'dribbles']
-        for s in stats:
-            if s in new_data and new_data[s] is not None:
-                merged[s] = new_data[s]
+
+    @staticmethod
+    def _merge_ratings(ratings: pd.Series, codes: np.ndarray, n_players: int) -> np.ndarray:
+        """Fold each player's ratings in source order, averaging every new rating
+        with the running value (rounded to one decimal)"""
+        merged = np.full(n_players, np.nan)
+        present = ratings.notna().to_numpy()
+        values, owners = ratings.to_numpy(dtype=float)[present], codes[present]
+        step = pd.Series(owners).groupby(owners).cumcount().to_numpy()
+        for i in range(int(step.max()) + 1 if len(step) else 0):
+            at = step == i
+            who, new = owners[at], values[at]
+            current = merged[who]
+            first = np.isnan(current)
+            # Python's round() keeps the exact half-way behaviour of the old merge
+            averaged = [round(v, 1) for v in ((current[~first] + new[~first]) / 2).tolist()]
+            merged[who[first]] = new[first]
+            merged[who[~first]] = averaged
+        return merged
 
     def _save_players_to_db(self, players: List[Dict[str, Any]], league: str) -> int:
         """Save merged player data to database"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        saved = 0
-
+        rows: List[Tuple[Any, ...]] = []
+        # external_id stays md5(name_club_league) so existing rows keep matching on upsert
+        league_suffix = f"_{league}".encode()
         for p in players:
-            try:
-                ext_id = hashlib.md5(f"{p.get('name','')}_{p.get('club','')}_{league}".encode()).hexdigest()
-                cursor.execute(
-                    """INSERT OR REPLACE INTO players (
-                        external_id, name, age, position, club, league, nationality,
-                        market_value, rating, goals, assists, matches, minutes_played,
-                        pass_accuracy, shots_per_game, key_passes, dribbles,
-                        aerial_duels, tackles, interceptions, clearances,
-                        yellow_cards, red_cards, fbref_id, transfermarkt_id,
-                        asa_id, sofascore_id, last_updated
-                    ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,CURRENT_TIMESTAMP)""",
-                    (
-                        ext_id, p.get('name'), p.get('age'), p.get('position'),
-                        p.get('club'), league, p.get('nationality'), p.get('market_value',0),
-                        p.get('rating',0), p.get('goals',0), p.get('assists',0),
-                        p.get('matches',0), p.get('minutes_played',0), p.get('pass_accuracy'),
-                        p.get('shots_per_game'), p.get('key_passes'), p.get('dribbles'),
-                        p.get('aerial_duels'), p.get('tackles'), p.get('interceptions'),
-                        p.get('clearances'), p.get('yellow_cards',0), p.get('red_cards',0),
-                        p.get('fbref_id'), p.get('transfermarkt_id'), p.get('asa_id'), p.get('sofascore_id')
-                    )
-                )
-                saved += 1
-            except Exception as e:
-                logger.error(f"Error saving player {p.get('name','Unknown')}: {e}")
-        conn.commit()
-        conn.close()
+            ext_id = hashlib.md5(f"{p.get('name','')}_{p.get('club','')}".encode() + league_suffix).hexdigest()
+            # Values in PLAYER_COLUMNS order
+            row = (
+                ext_id, p.get('name'), p.get('age'), p.get('position'),
+                p.get('club'), league, p.get('nationality'), p.get('market_value',0),
+                p.get('rating',0), p.get('goals',0), p.get('assists',0),
+                p.get('matches',0), p.get('minutes_played',0), p.get('pass_accuracy'),
+                p.get('shots_per_game'), p.get('key_passes'), p.get('dribbles'),
+                p.get('aerial_duels'), p.get('tackles'), p.get('interceptions'),
+                p.get('clearances'), p.get('yellow_cards',0), p.get('red_cards',0),
+                p.get('fbref_id'), p.get('transfermarkt_id'), p.get('asa_id'), p.get('sofascore_id')
+            )
+            # Validate up front so one bad value cannot abort the whole batch
+            if all(v is None or isinstance(v, SQLITE_VALUE_TYPES) for v in row):
+                rows.append(row)
+            else:
+                logger.error(f"Error saving player {p.get('name','Unknown')}: unsupported value type")
+
+        # Rebuilding the indexes covers the whole table, so it only pays off
+        # for a load into an empty table or one the batch largely replaces
+        if rows and len(rows) >= BULK_LOAD_MIN_SHARE * self.db.count_players():
+            with self.db.bulk_load():
+                self.db.upsert_players(rows)
+        else:
+            self.db.upsert_players(rows)
+        saved = len(rows)
+        self.db.mark_players_changed()
         logger.info(f"Saved {saved} players to database for {league}")
         return saved
 
     def get_data_coverage_report(self, league: str) -> Dict[str, Any]:
         """Generate report on data coverage by source"""
-        conn = self.db.get_connection()
-        sources = [
-            ('fbref_id', 'FBref'),
-            ('transfermarkt_id', 'Transfermarkt'),
-            ('sofascore_id', 'Sofascore'),
-            ('asa_id', 'ASA')
-        ]
-        coverage: Dict[str, Dict[str, Any]] = {}
-
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM players WHERE league = ?", (league,))
-        total = cursor.fetchone()[0]
+        return self.get_data_coverage_reports([league])[league]
 
-        for idf, name in sources:
-            cursor.execute(
-                f"SELECT COUNT(*) FROM players WHERE league = ? AND {idf} IS NOT NULL", (league,)
-            )
-            count = cursor.fetchone()[0]
-            coverage[name] = {
-                'count': count,
-                'percentage': round((count / total * 100) if total else 0, 1)
-            }
-
-        conn.close()
-        return {'league': league, 'total_players': total, 'sources': coverage}
+    def get_data_coverage_reports(self, leagues: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Generate coverage reports for several leagues from the player_coverage rollup"""
+        conn = self.db.get_connection()
+        rows = conn.execute(
+            "SELECT league, source, count FROM player_coverage "
+            "WHERE league IN (SELECT value FROM json_each(?))",
+            (json.dumps(leagues),)
+        ).fetchall()
+
+        counts = {(row[0], row[1]): row[2] for row in rows}
+        reports: Dict[str, Dict[str, Any]] = {}
+        for league in leagues:
+            total = counts.get((league, 'total'), 0)
+            coverage: Dict[str, Dict[str, Any]] = {}
+            for idf, name in self.COVERAGE_SOURCES:
+                count = counts.get((league, idf), 0)
+                coverage[name] = {
+                    'count': count,
+                    'percentage': round((count / total * 100) if total else 0, 1)
+                }
+            reports[league] = {'league': league, 'total_players': total, 'sources': coverage}
+        return reports
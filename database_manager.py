@@ -1,22 +1,137 @@
 import sqlite3
+import atexit
 import json
+import hashlib
+import os
+import queue
+import threading
+import time
+import zlib
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterator, List, Tuple, Union
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Columns written by player upserts, in bind order
+PLAYER_COLUMNS = (
+    'external_id', 'name', 'age', 'position', 'club', 'league', 'nationality',
+    'market_value', 'rating', 'goals', 'assists', 'matches', 'minutes_played',
+    'pass_accuracy', 'shots_per_game', 'key_passes', 'dribbles',
+    'aerial_duels', 'tackles', 'interceptions', 'clearances',
+    'yellow_cards', 'red_cards', 'fbref_id', 'transfermarkt_id',
+    'asa_id', 'sofascore_id'
+)
+
+# Updating in place keeps each player's id (and so watchlist entries) stable across syncs
+_UPSERT_PLAYER_SQL = (
+    f"INSERT INTO players ({', '.join(PLAYER_COLUMNS)}, last_updated) "
+    f"VALUES ({', '.join('?' * len(PLAYER_COLUMNS))}, CURRENT_TIMESTAMP) "
+    "ON CONFLICT(external_id) DO UPDATE SET "
+    + ", ".join(f"{col} = excluded.{col}" for col in PLAYER_COLUMNS[1:])
+    + ", last_updated = CURRENT_TIMESTAMP"
+)
+
+# Columns written by team upserts, in bind order; name is the conflict key
+TEAM_COLUMNS = (
+    'name', 'league', 'avg_age', 'market_value', 'total_players',
+    'stadium', 'manager', 'founded_year'
+)
+
+_UPSERT_TEAM_SQL = (
+    f"INSERT INTO teams ({', '.join(TEAM_COLUMNS)}, last_updated) "
+    f"VALUES ({', '.join('?' * len(TEAM_COLUMNS))}, CURRENT_TIMESTAMP) "
+    "ON CONFLICT(name) DO UPDATE SET "
+    + ", ".join(f"{col} = excluded.{col}" for col in TEAM_COLUMNS[1:])
+    + ", last_updated = CURRENT_TIMESTAMP"
+)
+
+def _compress_value(value: Union[str, bytes]) -> bytes:
+    """Encode a cache value for storage; bytes values are UTF-8 text"""
+    return zlib.compress(value.encode() if isinstance(value, str) else value)
+
+def _decompress_value(stored: Union[str, bytes]) -> str:
+    """Decode a stored cache value; entries written before compression are plain text"""
+    return zlib.decompress(stored).decode(errors="replace") if isinstance(stored, bytes) else stored
+
+# Cache values longer than this are written to content-addressed files beside
+# the database, keeping large pages out of the WAL; rows then hold "file:<sha256>"
+CACHE_FILE_THRESHOLD = 16384
+_CACHE_FILE_PREFIX = "file:"
+# Unreferenced cache files newer than this survive sweeps: a writer may be
+# about to insert the row pointing at them
+CACHE_FILE_GRACE_SECONDS = 300
+
+# Hot-path statements, kept as constants so every call reuses the same
+# prepared statement from the connection's statement cache
+_CACHE_GET_SQL = "SELECT value, expiry FROM cache WHERE key = ?"
+_CACHE_DELETE_EXPIRED_KEY_SQL = "DELETE FROM cache WHERE key = ? AND expiry <= ?"
+_CACHE_SET_SQL = (
+    "INSERT OR REPLACE INTO cache (key, value, expiry, created_at) "
+    "VALUES (?, ?, ?, CURRENT_TIMESTAMP)"
+)
+_CACHE_CLEAR_EXPIRED_SQL = "DELETE FROM cache WHERE expiry < ?"
+_CACHE_FILE_REFS_SQL = "SELECT value FROM cache WHERE typeof(value) = 'text' AND value LIKE 'file:%'"
+_LOG_SYNC_SQL = (
+    "INSERT INTO sync_history "
+    "(league, source, status, records_synced, error_message, started_at, completed_at) "
+    "VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+)
+_SYNC_HISTORY_SQL = "SELECT * FROM sync_history ORDER BY started_at DESC LIMIT ?"
+
+# Prepared statements kept per connection (sqlite3 default is 128)
+STATEMENT_CACHE_SIZE = 1024
+
+# sync_history rows are queued and written by one background thread, up to
+# SYNC_LOG_BATCH_SIZE per transaction after waiting briefly for more to arrive
+SYNC_LOG_QUEUE_SIZE = 1000
+SYNC_LOG_BATCH_SIZE = 100
+SYNC_LOG_BATCH_WAIT_SECONDS = 0.05
+
+# How often the background timer asks SQLite to refresh planner statistics
+OPTIMIZE_INTERVAL_SECONDS = 3600
+
+# Single-column player indexes that bulk loads drop and rebuild afterwards
+_BULK_LOAD_INDEXES = {
+    'idx_players_league': "CREATE INDEX IF NOT EXISTS idx_players_league ON players(league)",
+    'idx_players_position': "CREATE INDEX IF NOT EXISTS idx_players_position ON players(position)",
+    'idx_players_rating': "CREATE INDEX IF NOT EXISTS idx_players_rating ON players(rating)",
+}
+
 class DatabaseManager:
     """Manages SQLite database operations for soccer scouting data"""
+
+    # Source id columns counted in the player_coverage rollup
+    COVERAGE_ID_COLUMNS = ('fbref_id', 'transfermarkt_id', 'sofascore_id', 'asa_id')
     
     def __init__(self, db_path: str = "soccer_scout.db"):
         self.db_path = db_path
+        self.cache_dir = Path(db_path).resolve().parent / "cache"
+        # Bumped whenever player rows change so derived caches can be keyed on it
+        self.players_version = 0
+        self._local = threading.local()
+        # Serializes writers across the per-thread connections so they never hit SQLITE_BUSY
+        self._write_lock = threading.RLock()
         self.init_database()
+        self._schedule_optimize()
+        self._sync_log_queue: "queue.Queue[Tuple[str, str, str, int, Optional[str]]]" = queue.Queue(
+            maxsize=SYNC_LOG_QUEUE_SIZE
+        )
+        threading.Thread(target=self._sync_log_writer, name="sync-log-writer", daemon=True).start()
+        atexit.register(self.flush_sync_log)
     
     def init_database(self):
         """Initialize all database tables"""
         conn = sqlite3.connect(self.db_path)
+        # Larger pages keep big cache blobs on fewer overflow pages; only takes
+        # effect while the file is still empty, so it must precede WAL
+        conn.execute("PRAGMA page_size=8192")
+        # WAL is persistent in the file: readers no longer block on writers and
+        # commits need a single fsync
+        conn.execute("PRAGMA journal_mode=WAL").fetchone()
         cursor = conn.cursor()
         
         # Players table with comprehensive stats
@@ -75,7 +190,7 @@ class DatabaseManager:
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS cache (
                 key TEXT PRIMARY KEY,
-                value TEXT,
+                value BLOB,
                 expiry TIMESTAMP,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
@@ -95,6 +210,31 @@ class DatabaseManager:
             )
         """)
         
+        # Per-team aggregates derived from players, refreshed after player writes
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS team_aggregates (
+                team_name TEXT,
+                league TEXT,
+                squad_size INTEGER,
+                avg_age REAL,
+                avg_rating REAL,
+                total_value REAL,
+                total_goals INTEGER,
+                total_assists INTEGER,
+                PRIMARY KEY (team_name, league)
+            )
+        """)
+        
+        # Per-league player counts overall ('total') and per source id column
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS player_coverage (
+                league TEXT,
+                source TEXT,
+                count INTEGER,
+                PRIMARY KEY (league, source)
+            )
+        """)
+        
         # User watchlist table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS watchlist (
@@ -108,67 +248,287 @@ class DatabaseManager:
         """)
         
         # Create indexes for better performance
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_players_league ON players(league)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_players_position ON players(position)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_players_rating ON players(rating)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cache_expiry ON cache(expiry)")
+        for index_sql in _BULK_LOAD_INDEXES.values():
+            cursor.execute(index_sql)
+        # Analytics cohorts filter on position + minimum minutes; team views on club + league
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_players_pos_min ON players(position, minutes_played)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_players_club_league ON players(club, league)")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_players_filter "
+            "ON players(league, position, age, rating, minutes_played)"
+        )
+        # Advanced search predicates usually combine league, rating and age
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_players_search ON players(league, rating, age)")
+        # Covers data coverage counts so they never touch the table rows
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_players_coverage "
+            "ON players(league, fbref_id, transfermarkt_id, sofascore_id, asa_id)"
+        )
+        # Only rows with an expiry can ever be swept
+        cursor.execute("DROP INDEX IF EXISTS idx_cache_expiry")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cache_expired ON cache(expiry) WHERE expiry IS NOT NULL")
         
+        conn.commit()
+        if conn.execute("SELECT 1 FROM team_aggregates LIMIT 1").fetchone() is None:
+            self._refresh_team_aggregates(conn)
+        if conn.execute("SELECT 1 FROM player_coverage LIMIT 1").fetchone() is None:
+            self._refresh_player_coverage(conn)
         conn.commit()
         conn.close()
         logger.info("Database initialized successfully")
 
-    def get_connection(self) -> sqlite3.Connection:
-        """Get database connection with row factory"""
-        conn = sqlite3.connect(self.db_path)
+    def mark_players_changed(self) -> None:
+        """Invalidate caches derived from the players table"""
+        with self.transaction() as conn:
+            self._refresh_team_aggregates(conn)
+            self._refresh_player_coverage(conn)
+            # Bumped under the write lock so concurrent syncs never lose an increment
+            self.players_version += 1
+
+    def _refresh_team_aggregates(self, conn: sqlite3.Connection) -> None:
+        """Rebuild the team_aggregates table from players"""
+        conn.execute("DELETE FROM team_aggregates")
+        conn.execute("""
+            INSERT INTO team_aggregates
+            SELECT 
+                club,
+                league,
+                COUNT(*),
+                AVG(age),
+                AVG(rating),
+                SUM(market_value),
+                SUM(goals),
+                SUM(assists)
+            FROM players
+            GROUP BY club, league
+            HAVING COUNT(*) >= 5
+        """)
+
+    def _refresh_player_coverage(self, conn: sqlite3.Connection) -> None:
+        """Rebuild the player_coverage rollup from players"""
+        counts = ", ".join(f"COUNT({col})" for col in self.COVERAGE_ID_COLUMNS)
+        rows = conn.execute(f"SELECT league, COUNT(*), {counts} FROM players GROUP BY league").fetchall()
+        conn.execute("DELETE FROM player_coverage")
+        conn.executemany(
+            "INSERT INTO player_coverage (league, source, count) VALUES (?, ?, ?)",
+            [
+                (row[0], source, count)
+                for row in rows
+                for source, count in zip(('total',) + self.COVERAGE_ID_COLUMNS, row[1:])
+            ]
+        )
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a new connection with row factory and per-connection PRAGMAs"""
+        conn = sqlite3.connect(self.db_path, cached_statements=STATEMENT_CACHE_SIZE)
         conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-64000")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Get the calling thread's long-lived connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.conn = conn
         return conn
     
-    def cache_get(self, key: str) -> Optional[str]:
-        """Get cached value if not expired"""
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Yield the calling thread's long-lived connection"""
+        yield self.get_connection()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run the enclosed writes as one transaction on the thread's connection,
+        joining an already open transaction when nested"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "SELECT value FROM cache WHERE key = ? AND expiry > ?",
-            (key, datetime.now())
-        )
-        result = cursor.fetchone()
-        conn.close()
-        
-        return result["value"] if result else None
+        with self._write_lock:
+            if conn.in_transaction:
+                yield conn
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def count_players(self) -> int:
+        """Number of rows in the players table"""
+        return self.get_connection().execute("SELECT COUNT(*) FROM players").fetchone()[0]
+
+    @contextmanager
+    def bulk_load(self) -> Iterator[None]:
+        """Drop the non-essential player indexes for a bulk write, then rebuild
+        them and refresh planner statistics"""
+        with self.transaction() as conn:
+            for name in _BULK_LOAD_INDEXES:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+        try:
+            yield
+        finally:
+            with self.transaction() as conn:
+                for index_sql in _BULK_LOAD_INDEXES.values():
+                    conn.execute(index_sql)
+                conn.execute("ANALYZE players")
+
+    def optimize(self) -> None:
+        """Run PRAGMA optimize so SQLite refreshes stale planner statistics"""
+        with self._write_lock:
+            conn = self._open_connection()
+            try:
+                conn.execute("PRAGMA optimize")
+            finally:
+                conn.close()
+
+    def _schedule_optimize(self) -> None:
+        """Arm the background timer for the next periodic optimize"""
+        timer = threading.Timer(OPTIMIZE_INTERVAL_SECONDS, self._periodic_optimize)
+        timer.daemon = True
+        timer.start()
+
+    def _periodic_optimize(self) -> None:
+        """Timer callback: optimize, then re-arm"""
+        try:
+            self.optimize()
+        except sqlite3.Error as e:
+            logger.warning(f"Periodic PRAGMA optimize failed: {e}")
+        self._schedule_optimize()
+
+    def close(self) -> None:
+        """Close the calling thread's long-lived connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
     
-    def cache_set(self, key: str, value: str, ttl_seconds: int = 3600) -> None:
-        """Set cached value with TTL"""
+    def upsert_players(self, rows: List[Tuple[Any, ...]]) -> None:
+        """Insert or update player rows (values in PLAYER_COLUMNS order) in one transaction"""
+        with self.transaction() as conn:
+            conn.executemany(_UPSERT_PLAYER_SQL, rows)
+
+    def upsert_player(self, data: Dict[str, Any]) -> None:
+        """Insert or update one player keyed on external_id; columns missing from
+        data keep their stored values"""
+        if not data.get('external_id'):
+            raise ValueError("upsert_player requires an external_id")
+        columns = [col for col in PLAYER_COLUMNS if col in data]
+        updates = "".join(f"{col} = excluded.{col}, " for col in columns[1:])
+        with self.transaction() as conn:
+            conn.execute(
+                f"INSERT INTO players ({', '.join(columns)}, last_updated) "
+                f"VALUES ({', '.join('?' * len(columns))}, CURRENT_TIMESTAMP) "
+                f"ON CONFLICT(external_id) DO UPDATE SET {updates}last_updated = CURRENT_TIMESTAMP",
+                [data[col] for col in columns]
+            )
+
+    def upsert_teams(self, rows: List[Tuple[Any, ...]]) -> None:
+        """Insert or update team rows (values in TEAM_COLUMNS order) keyed on name"""
+        with self.transaction() as conn:
+            conn.executemany(_UPSERT_TEAM_SQL, rows)
+    
+    def cache_get(self, key: str, as_bytes: bool = False) -> Optional[Union[str, bytes]]:
+        """Get cached value if not expired (as UTF-8 bytes with as_bytes); an
+        expired entry is deleted on read"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        expiry = datetime.now() + timedelta(seconds=ttl_seconds)
-        cursor.execute(
-            """
-            INSERT OR REPLACE INTO cache (key, value, expiry, created_at) 
-            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            """,
-            (key, value, expiry)
-        )
-        
-        conn.commit()
-        conn.close()
+        result = conn.execute(_CACHE_GET_SQL, (key,)).fetchone()
+        if result is None:
+            return None
+
+        # Expiry is stored as an ISO timestamp string, so it compares as text
+        now = datetime.now().isoformat(" ")
+        if result["expiry"] is not None and result["expiry"] > now:
+            return self._decode_cache_value(result["value"], as_bytes)
+
+        with self.transaction() as conn:
+            conn.execute(_CACHE_DELETE_EXPIRED_KEY_SQL, (key, now))
+        return None
+    
+    def cache_set(self, key: str, value: Union[str, bytes], ttl_seconds: int = 3600) -> None:
+        """Set cached value with TTL (stored compressed)"""
+        expiry = (datetime.now() + timedelta(seconds=ttl_seconds)).isoformat(" ")
+        value = self._encode_cache_value(value)
+        with self.transaction() as conn:
+            conn.execute(_CACHE_SET_SQL, (key, value, expiry))
+    
+    def cache_set_many(self, items: List[Tuple[str, Union[str, bytes], int]]) -> None:
+        """Set several (key, value, ttl_seconds) cache entries in one transaction"""
+        now = datetime.now()
+        # Compress before taking the write lock
+        rows = [
+            (key, self._encode_cache_value(value), (now + timedelta(seconds=ttl)).isoformat(" "))
+            for key, value, ttl in items
+        ]
+        with self.transaction() as conn:
+            conn.executemany(_CACHE_SET_SQL, rows)
     
+    def _cache_file_path(self, digest: str) -> Path:
+        """Location of the cache file for a content hash"""
+        return self.cache_dir / digest[:2] / digest
+
+    def _encode_cache_value(self, value: Union[str, bytes]) -> Union[str, bytes]:
+        """Compress a cache value, moving large ones out to a file and returning its reference"""
+        if len(value) <= CACHE_FILE_THRESHOLD:
+            return _compress_value(value)
+
+        raw = value.encode() if isinstance(value, str) else value
+        digest = hashlib.sha256(raw).hexdigest()
+        path = self._cache_file_path(digest)
+        if path.exists():
+            # Refresh the mtime so a concurrent sweep treats the file as in use
+            os.utime(path)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{digest}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(zlib.compress(raw))
+            os.replace(tmp, path)
+        return _CACHE_FILE_PREFIX + digest
+
+    def _decode_cache_value(self, stored: Union[str, bytes], as_bytes: bool = False) -> Optional[Union[str, bytes]]:
+        """Decode a stored cache value, reading file references from disk"""
+        if isinstance(stored, str) and stored.startswith(_CACHE_FILE_PREFIX):
+            try:
+                stored = self._cache_file_path(stored[len(_CACHE_FILE_PREFIX):]).read_bytes()
+            except OSError:
+                return None
+        if as_bytes:
+            # Stored pages are UTF-8, so callers wanting bytes skip the decode
+            return zlib.decompress(stored) if isinstance(stored, bytes) else stored.encode()
+        return _decompress_value(stored)
+
+    def _sweep_cache_files(self) -> int:
+        """Delete cache files no longer referenced by any cache row"""
+        if not self.cache_dir.is_dir():
+            return 0
+        cutoff = time.time() - CACHE_FILE_GRACE_SECONDS
+        removed = 0
+        with self._write_lock:
+            referenced = {
+                row[0][len(_CACHE_FILE_PREFIX):]
+                for row in self.get_connection().execute(_CACHE_FILE_REFS_SQL)
+            }
+            for path in self.cache_dir.glob("*/*"):
+                if path.name not in referenced and path.stat().st_mtime < cutoff:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+        return removed
+
     def clear_expired_cache(self) -> int:
-        """Remove expired cache entries"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        deleted = cursor.execute(
-            "DELETE FROM cache WHERE expiry < ?",
-            (datetime.now(),)
-        ).rowcount
-        
-        conn.commit()
-        conn.close()
+        """Remove expired cache entries and the files only they referenced"""
+        with self.transaction() as conn:
+            deleted = conn.execute(_CACHE_CLEAR_EXPIRED_SQL, (datetime.now().isoformat(" "),)).rowcount
+        removed_files = self._sweep_cache_files()
         
         if deleted > 0:
             logger.info(f"Cleared {deleted} expired cache entries")
+        if removed_files > 0:
+            logger.info(f"Removed {removed_files} unreferenced cache files")
+        self.optimize()
         
         return deleted
     
@@ -179,41 +539,52 @@ class DatabaseManager:
         status: str,
         records: int = 0,
         error: Optional[str] = None
-    ) -> int:
-        """Log sync operation"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            """
-            INSERT INTO sync_history 
-            (league, source, status, records_synced, error_message, started_at, completed_at)
-            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-            """,
-            (league, source, status, records, error)
-        )
-        
-        sync_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
-        return sync_id
+    ) -> None:
+        """Queue a sync operation for the background sync_history writer"""
+        self._sync_log_queue.put((league, source, status, records, error))
+
+    def flush_sync_log(self) -> None:
+        """Block until every queued sync operation has been written"""
+        self._sync_log_queue.join()
+
+    def _sync_log_writer(self) -> None:
+        """Background loop writing queued sync operations in batches"""
+        while True:
+            batch = [self._sync_log_queue.get()]
+            deadline = time.monotonic() + SYNC_LOG_BATCH_WAIT_SECONDS
+            while len(batch) < SYNC_LOG_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._sync_log_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.log_sync_many(batch)
+            except sqlite3.Error as e:
+                logger.error(f"Failed to write {len(batch)} sync log entries: {e}")
+            finally:
+                for _ in batch:
+                    self._sync_log_queue.task_done()
+    
+    def log_sync_many(self, entries: List[Tuple[str, str, str, int, Optional[str]]]) -> None:
+        """Log several (league, source, status, records, error) sync operations at once"""
+        with self.transaction() as conn:
+            conn.executemany(_LOG_SYNC_SQL, entries)
     
     def get_sync_history(self, limit: int = 10) -> list[Dict[str, Any]]:
         """Get recent sync history"""
+        # Include operations still waiting in the writer queue
+        self.flush_sync_log()
         conn = self.get_connection()
         cursor = conn.cursor()
+        # Plain tuples, zipped against column names read once from the cursor
+        cursor.row_factory = None
         
-        cursor.execute(
-            """
-            SELECT * FROM sync_history 
-            ORDER BY started_at DESC 
-            LIMIT ?
-            """,
-            (limit,)
-        )
+        cursor.execute(_SYNC_HISTORY_SQL, (limit,))
         
-        history = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        columns = [d[0] for d in cursor.description]
+        history = [dict(zip(columns, row)) for row in cursor.fetchall()]
         
         return history
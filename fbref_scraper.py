@@ -2,14 +2,72 @@ import logging
 import re
 from typing import List, Dict, Optional, Any
 from urllib.parse import urljoin
-from bs4 import BeautifulSoup
+import numpy as np
+import pandas as pd
+from lxml import etree, html as lxml_html
 
-from scrapers.base_scraper import BaseScraper
+from scrapers.base_scraper import BaseScraper, clean_text, parse_float, parse_number
 from config import Config
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Compiled once; the vectorized column parsers apply them to whole tables
+_NON_DIGITS_RE = re.compile(r'\D+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+class _TableRowsTarget:
+    """lxml parser target collecting the body rows of one table by id as lists of
+    (cell text, first link href) pairs, without building a document tree"""
+
+    def __init__(self, table_id: str):
+        self.table_id = table_id
+        self.found = False
+        self.rows: List[List[tuple]] = []
+        self._depth = 0  # table nesting depth while inside the target table
+        self._in_body = False
+        self._row: Optional[List[tuple]] = None
+        self._cell: Optional[List[Any]] = None  # [text parts, href]
+
+    def start(self, tag: str, attrib: Dict[str, str]) -> None:
+        if self._depth:
+            if tag == 'table':
+                self._depth += 1
+            elif self._depth == 1:
+                if tag == 'tbody':
+                    self._in_body = True
+                elif tag == 'tr' and self._in_body:
+                    self._row = []
+                elif tag in ('td', 'th') and self._row is not None:
+                    self._cell = [[], None]
+                elif tag == 'a' and self._cell is not None and self._cell[1] is None and 'href' in attrib:
+                    self._cell[1] = attrib['href']
+        elif not self.found and tag == 'table' and attrib.get('id') == self.table_id:
+            self.found = True
+            self._depth = 1
+
+    def end(self, tag: str) -> None:
+        if not self._depth:
+            return
+        if tag == 'table':
+            self._depth -= 1
+        elif self._depth == 1:
+            if tag in ('td', 'th') and self._cell is not None:
+                self._row.append((''.join(self._cell[0]).strip(), self._cell[1]))
+                self._cell = None
+            elif tag == 'tr' and self._row is not None:
+                self.rows.append(self._row)
+                self._row = None
+            elif tag == 'tbody':
+                self._in_body = False
+
+    def data(self, data: str) -> None:
+        if self._cell is not None:
+            self._cell[0].append(data)
+
+    def close(self) -> List[List[tuple]]:
+        return self.rows
+
 class FBrefScraper(BaseScraper):
     """Scraper for FBref.com statistics"""
 
@@ -31,84 +89,81 @@ class FBrefScraper(BaseScraper):
 
     def parse_player_data(self, html: str, league: str) -> List[Dict[str, Any]]:
         """Parse player statistics from FBref HTML"""
-        soup = BeautifulSoup(html, 'html.parser')
-        players_data: List[Dict[str, Any]] = []
-
-        stats_table = soup.find('table', {'id': 'stats_standard'})
-        if not stats_table:
+        # Parser events go straight into row lists; no DOM is built for the page
+        target = _TableRowsTarget('stats_standard')
+        parser = etree.HTMLParser(target=target)
+        parser.feed(html)
+        rows = parser.close()
+        if not target.found:
             logger.warning("Could not find stats table in FBref page")
-            return players_data
-
-        tbody = stats_table.find('tbody')
-        if not tbody:
-            return players_data
-
-        for row in tbody.find_all('tr'):
-            if 'thead' in (row.get('class') or []):
-                continue
-
-            player_data = self._parse_player_row(row, league)
-            if player_data:
-                players_data.append(player_data)
+            return []
 
+        # Each body cell is a (text, first link href) pair
+        players_data = self._parse_player_table(pd.DataFrame(rows), league)
         logger.info(f"Parsed {len(players_data)} players from FBref for {league}")
         return players_data
 
-    def _parse_player_row(self, row, league: str) -> Optional[Dict[str, Any]]:
-        """Parse individual player row"""
-        try:
-            cells = row.find_all(['td', 'th'])
-            if len(cells) < 20:
-                return None
-
-            player_link = cells[0].find('a')
-            if not player_link:
-                return None
-
-            player_name = self.clean_text(player_link.text)
-            player_href = player_link.get('href', '')
-            fbref_id = player_href.split('/')[-2] if player_href else None
-
-            data = {
-                'name': player_name,
-                'fbref_id': fbref_id,
-                'league': league,
-                'nationality': self.clean_text(cells[1].get_text()) if len(cells) > 1 else None,
-                'position': self.clean_text(cells[2].get_text()) if len(cells) > 2 else None,
-                'club': self.clean_text(cells[3].get_text()) if len(cells) > 3 else None,
-                'age': self.parse_number(cells[4].get_text()) if len(cells) > 4 else 0,
-                'birth_year': self.parse_number(cells[5].get_text()) if len(cells) > 5 else 0,
-                'matches': self.parse_number(cells[6].get_text()) if len(cells) > 6 else 0,
-                'starts': self.parse_number(cells[7].get_text()) if len(cells) > 7 else 0,
-                'minutes': self.parse_number(cells[8].get_text()) if len(cells) > 8 else 0,
-                'minutes_per_90': self.parse_float(cells[9].get_text()) if len(cells) > 9 else 0.0,
-                'goals': self.parse_number(cells[10].get_text()) if len(cells) > 10 else 0,
-                'assists': self.parse_number(cells[11].get_text()) if len(cells) > 11 else 0,
-                'goals_assists': self.parse_number(cells[12].get_text()) if len(cells) > 12 else 0,
-                'goals_minus_pk': self.parse_number(cells[13].get_text()) if len(cells) > 13 else 0,
-                'penalties': self.parse_number(cells[14].get_text()) if len(cells) > 14 else 0,
-                'penalties_attempted': self.parse_number(cells[15].get_text()) if len(cells) > 15 else 0,
-                'yellow_cards': self.parse_number(cells[16].get_text()) if len(cells) > 16 else 0,
-                'red_cards': self.parse_number(cells[17].get_text()) if len(cells) > 17 else 0,
-                'xg': self.parse_float(cells[18].get_text()) if len(cells) > 18 else 0.0,
-                'npxg': self.parse_float(cells[19].get_text()) if len(cells) > 19 else 0.0,
-                'xa': self.parse_float(cells[20].get_text()) if len(cells) > 20 else 0.0,
-                'source': 'fbref'
-            }
-
-            if data['minutes'] > 0:
-                mins90 = data['minutes'] / 90.0
-                data['goals_per_90'] = round(data['goals'] / mins90, 2)
-                data['assists_per_90'] = round(data['assists'] / mins90, 2)
-                data['xg_per_90'] = round(data['xg'] / mins90, 2)
-            else:
-                data['goals_per_90'] = data['assists_per_90'] = data['xg_per_90'] = 0.0
-
-            return data
-
-        except Exception as e:
-            logger.error(f"Error parsing player row: {e}")
-            return None
+    def _parse_player_table(self, table: pd.DataFrame, league: str) -> List[Dict[str, Any]]:
+        """Parse the standard stats table column by column"""
+        if table.shape[1] < 20:
+            return []
+        table.columns = range(table.shape[1])
+
+        # Skip repeated header rows (no player link) and short rows
+        links = table[0].map(lambda cell: cell[1] if isinstance(cell, tuple) else None)
+        keep = links.notna() & table[19].notna()
+        table, links = table[keep], links[keep]
+        if table.empty:
+            return []
+        cells = table.map(lambda cell: cell[0] if isinstance(cell, tuple) else '')
+
+        def text(i: int) -> pd.Series:
+            return cells[i].str.replace(_WHITESPACE_RE, ' ', regex=True).str.strip()
+
+        def number(i: int) -> pd.Series:
+            digits = cells[i].str.replace(_NON_DIGITS_RE, '', regex=True)
+            return pd.to_numeric(digits, errors='coerce').fillna(0).astype(int)
+
+        def decimal(i: int) -> pd.Series:
+            cleaned = cells[i].str.replace('%', '', regex=False).str.replace(',', '.', regex=False)
+            return pd.to_numeric(cleaned, errors='coerce').fillna(0.0).astype(float)
+
+        df = pd.DataFrame({
+            'name': text(0),
+            'fbref_id': links.map(lambda href: href.split('/')[-2] if href else None),
+            'league': league,
+            'nationality': text(1),
+            'position': text(2),
+            'club': text(3),
+            'age': number(4),
+            'birth_year': number(5),
+            'matches': number(6),
+            'starts': number(7),
+            'minutes': number(8),
+            'minutes_per_90': decimal(9),
+            'goals': number(10),
+            'assists': number(11),
+            'goals_assists': number(12),
+            'goals_minus_pk': number(13),
+            'penalties': number(14),
+            'penalties_attempted': number(15),
+            'yellow_cards': number(16),
+            'red_cards': number(17),
+            'xg': decimal(18),
+            'npxg': decimal(19),
+            # Only xa may be missing; the width check above covers columns 0-19
+            'xa': decimal(20) if cells.shape[1] > 20 else 0.0,
+            'source': 'fbref',
+        })
+
+        mins90 = df['minutes'].to_numpy() / 90.0
+        played = mins90 > 0
+        for column, stat in (('goals_per_90', 'goals'), ('assists_per_90', 'assists'), ('xg_per_90', 'xg')):
+            per90 = np.divide(df[stat].to_numpy(dtype=float), mins90, out=np.zeros(len(df)), where=played)
+            # Python's round() keeps the exact half-way behaviour of the per-row math
+            df[column] = [round(v, 2) for v in per90.tolist()]
+
+        return df.astype(object).to_dict('records')
 
     def scrape_player_detailed(self, fbref_id: str) -> Optional[Dict[str, Any]]:
         """Scrape detailed stats for a specific player"""
@@ -120,15 +175,15 @@ class FBrefScraper(BaseScraper):
         if not html:
             return None
 
-        soup = BeautifulSoup(html, 'html.parser')
+        tree = lxml_html.document_fromstring(html)
         detailed: Dict[str, Any] = {}
 
-        scouting_table = soup.find('table', {'id': 'scout_summary'})
-        if scouting_table:
+        scouting_table = tree.find(".//table[@id='scout_summary']")
+        if scouting_table is not None:
             detailed['scouting'] = self._parse_scouting_report(scouting_table)
 
-        season_table = soup.find('table', {'id': 'stats'})
-        if season_table:
+        season_table = tree.find(".//table[@id='stats']")
+        if season_table is not None:
             detailed['seasons'] = self._parse_season_stats(season_table)
 
         return detailed
@@ -136,32 +191,31 @@ class FBrefScraper(BaseScraper):
     def _parse_scouting_report(self, table) -> Dict[str, Dict[str, Any]]:
         """Parse scouting report percentiles"""
         report: Dict[str, Dict[str, Any]] = {}
-        for row in table.find_all('tr'):
-            cells = row.find_all(['td', 'th'])
-            if len(cells) >= 3:
-                name = self.clean_text(cells[0].get_text())
-                pct = self.parse_number(cells[1].get_text())
-                per90 = self.parse_float(cells[2].get_text())
-                report[name] = {'percentile': pct, 'per_90': per90}
+        for row in table.iter('tr'):
+            texts = [cell.text_content() for cell in row.iter('td', 'th')]
+            if len(texts) >= 3:
+                name = clean_text(texts[0])
+                report[name] = {'percentile': parse_number(texts[1]), 'per_90': parse_float(texts[2])}
         return report
 
     def _parse_season_stats(self, table) -> List[Dict[str, Any]]:
         """Parse historical season statistics"""
         seasons: List[Dict[str, Any]] = []
-        tbody = table.find('tbody')
-        if not tbody:
+        tbody = table.find('.//tbody')
+        if tbody is None:
             return seasons
-        for row in tbody.find_all('tr'):
-            cells = row.find_all(['td', 'th'])
-            if len(cells) > 10:
+        for row in tbody.iter('tr'):
+            # Read each cell's text once, in C, instead of per-field get_text() walks
+            texts = [cell.text_content() for cell in row.iter('td', 'th')]
+            if len(texts) > 10:
                 seasons.append({
-                    'season': self.clean_text(cells[0].get_text()),
-                    'age': self.parse_number(cells[1].get_text()),
-                    'club': self.clean_text(cells[2].get_text()),
-                    'league': self.clean_text(cells[4].get_text()),
-                    'matches': self.parse_number(cells[5].get_text()),
-                    'minutes': self.parse_number(cells[6].get_text()),
-                    'goals': self.parse_number(cells[7].get_text()),
-                    'assists': self.parse_number(cells[8].get_text()),
+                    'season': clean_text(texts[0]),
+                    'age': parse_number(texts[1]),
+                    'club': clean_text(texts[2]),
+                    'league': clean_text(texts[4]),
+                    'matches': parse_number(texts[5]),
+                    'minutes': parse_number(texts[6]),
+                    'goals': parse_number(texts[7]),
+                    'assists': parse_number(texts[8]),
                 })
         return seasons
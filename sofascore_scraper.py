@@ -1,14 +1,17 @@
 import json
-import time
 import logging
+import threading
 from typing import List, Dict, Optional, Any
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
+try:
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.chrome.options import Options
+    from selenium.common.exceptions import TimeoutException
+    from webdriver_manager.chrome import ChromeDriverManager
+except ImportError:  # browser fallback unavailable; the JSON API path still works
+    webdriver = None
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 
@@ -18,18 +21,47 @@ from config import Config
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Player statistics requested per API page and the fields kept from each row
+API_PAGE_SIZE = 100
+API_STAT_FIELDS = "rating,goals,assists,appearances,minutesPlayed"
+
+# Player rows on the rendered statistics page (current and older markup)
+PLAYER_ROW_SELECTOR = "[data-testid='player-statistics-row'], .player-statistics-row, .statistics-row"
+
+# Reads every player row in the browser and returns plain values in one WebDriver call
+HARVEST_ROWS_JS = """
+let rows = document.querySelectorAll("[data-testid='player-statistics-row']");
+if (!rows.length) rows = document.querySelectorAll(".player-statistics-row, .statistics-row");
+return Array.from(rows, row => {
+    const name = row.querySelector(".player-name, [data-testid='player-name']");
+    const rating = row.querySelector(".rating, [data-testid='rating']");
+    const link = row.querySelector("a");
+    return {
+        name: name ? name.innerText : null,
+        rating: rating ? rating.innerText : null,
+        stats: Array.from(row.querySelectorAll(".stat-value, [data-testid*='stat']"), el => el.innerText),
+        href: link ? link.href : null
+    };
+});
+"""
+
 class SofascoreScraper(BaseScraper):
-    """Scraper for Sofascore ratings and match data using Selenium"""
+    """Scraper for Sofascore ratings and match data via its JSON API, with a Selenium fallback"""
     BASE_URL = "https://www.sofascore.com"
+    API_URL = "https://api.sofascore.com/api/v1"
 
     def __init__(self, db_manager: Any):
         super().__init__(db_manager)
-        self.driver: Optional[webdriver.Chrome] = None
+        self.driver: Optional[Any] = None
+        # One browser per scraper; concurrent league syncs take turns with it
+        self._driver_lock = threading.RLock()
 
     def init_driver(self) -> None:
         """Initialize Selenium Chrome driver"""
         if self.driver:
             return
+        if webdriver is None:
+            raise RuntimeError("Selenium is not installed")
 
         chrome_options = Options()
         if self.config.CHROME_HEADLESS:
@@ -49,7 +81,6 @@ class SofascoreScraper(BaseScraper):
                 ChromeDriverManager().install(),
                 options=chrome_options
             )
-            self.driver.implicitly_wait(10)
             logger.info("Chrome driver initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Chrome driver: {e}")
@@ -57,10 +88,11 @@ class SofascoreScraper(BaseScraper):
 
     def close_driver(self) -> None:
         """Close Selenium driver"""
-        if self.driver:
-            self.driver.quit()
-            self.driver = None
-            logger.info("Chrome driver closed")
+        with self._driver_lock:
+            if self.driver:
+                self.driver.quit()
+                self.driver = None
+                logger.info("Chrome driver closed")
 
     def scrape_league(self, league: str) -> List[Dict[str, Any]]:
         """Scrape player ratings for a league"""
@@ -69,26 +101,96 @@ class SofascoreScraper(BaseScraper):
             logger.error(f"No Sofascore configuration for league: {league}")
             return []
 
+        players_data = self._scrape_league_api(league_config['sofascore_id'], league)
+        if players_data:
+            return players_data
+
+        logger.warning(f"No Sofascore API data for {league}, falling back to browser scrape")
+        return self._scrape_league_browser(league, league_config['sofascore_id'])
+
+    def _get_json(self, url: str) -> Optional[Dict[str, Any]]:
+        """Fetch and decode a JSON API response"""
+        text = self.make_request(url)
+        return json.loads(text) if text else None
+
+    def _scrape_league_api(self, tournament_id: str, league: str) -> List[Dict[str, Any]]:
+        """Fetch current-season player statistics from the Sofascore API"""
+        players_data: List[Dict[str, Any]] = []
         try:
-            self.init_driver()
-            url = f"{self.BASE_URL}/tournament/football/usa/{league.lower().replace(' ', '-')}/{league_config['sofascore_id']}"
-            self.driver.get(url)
-            time.sleep(3)
+            seasons = self._get_json(f"{self.API_URL}/unique-tournament/{tournament_id}/seasons")
+            if not seasons or not seasons.get('seasons'):
+                return players_data
+            # Seasons are listed newest first
+            season_id = seasons['seasons'][0]['id']
 
-            try:
-                stats_tab = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Statistics')]")
+            offset = 0
+            while True:
+                page = self._get_json(
+                    f"{self.API_URL}/unique-tournament/{tournament_id}/season/{season_id}/statistics"
+                    f"?limit={API_PAGE_SIZE}&offset={offset}&order=-rating"
+                    f"&accumulation=total&fields={API_STAT_FIELDS}"
                 )
-                stats_tab.click()
-                time.sleep(2)
-            except TimeoutException:
-                logger.warning("Statistics tab not found, continuing without click")
+                if not page:
+                    break
+                for row in page.get('results', []):
+                    data = self._parse_api_row(row, league)
+                    if data:
+                        players_data.append(data)
+                if page.get('page', 1) >= page.get('pages', 1):
+                    break
+                offset += API_PAGE_SIZE
 
-            return self.parse_player_data(self.driver.page_source, league)
+            logger.info(f"Fetched {len(players_data)} players from Sofascore API for {league}")
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error(f"Unexpected Sofascore API response for {league}: {e}")
+        return players_data
 
-        except Exception as e:
-            logger.error(f"Error scraping Sofascore for {league}: {e}")
-            return []
+    def _parse_api_row(self, row: Dict[str, Any], league: str) -> Optional[Dict[str, Any]]:
+        """Map one API statistics row onto the scraper's player schema"""
+        player = row.get('player') or {}
+        if not player.get('name'):
+            return None
+        return {
+            'name': player['name'].strip(),
+            'sofascore_id': str(player['id']) if player.get('id') is not None else None,
+            'rating': round(float(row.get('rating') or 0.0), 2),
+            'league': league,
+            'matches': int(row.get('appearances') or 0),
+            'goals': int(row.get('goals') or 0),
+            'assists': int(row.get('assists') or 0),
+            'minutes': int(row.get('minutesPlayed') or 0),
+            'source': 'sofascore'
+        }
+
+    def _scrape_league_browser(self, league: str, tournament_id: str) -> List[Dict[str, Any]]:
+        """Scrape player ratings from the rendered tournament page"""
+        with self._driver_lock:
+            try:
+                self.init_driver()
+                url = f"{self.BASE_URL}/tournament/football/usa/{league.lower().replace(' ', '-')}/{tournament_id}"
+                self.driver.get(url)
+
+                try:
+                    stats_tab = WebDriverWait(self.driver, 10).until(
+                        EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Statistics')]"))
+                    )
+                    stats_tab.click()
+                except TimeoutException:
+                    logger.warning("Statistics tab not found, continuing without click")
+
+                # Returns as soon as the rows render instead of sleeping a fixed time
+                try:
+                    WebDriverWait(self.driver, 15).until(
+                        EC.presence_of_all_elements_located((By.CSS_SELECTOR, PLAYER_ROW_SELECTOR))
+                    )
+                except TimeoutException:
+                    logger.warning("Player statistics rows did not load")
+
+                return self.parse_player_data(self.driver.page_source, league)
+
+            except Exception as e:
+                logger.error(f"Error scraping Sofascore for {league}: {e}")
+                return []
 
     def parse_player_data(self, html: str, league: str) -> List[Dict[str, Any]]:
         """Parse player data from Sofascore page"""
@@ -97,12 +199,8 @@ class SofascoreScraper(BaseScraper):
             if not self.driver:
                 return players_data
 
-            player_elements = self.driver.find_elements(By.CSS_SELECTOR, "[data-testid='player-statistics-row']")
-            if not player_elements:
-                player_elements = self.driver.find_elements(By.CSS_SELECTOR, ".player-statistics-row, .statistics-row")
-
-            for element in player_elements:
-                data = self._parse_player_element(element, league)
+            for row in self.driver.execute_script(HARVEST_ROWS_JS) or []:
+                data = self._parse_player_row(row, league)
                 if data:
                     players_data.append(data)
 
@@ -114,34 +212,22 @@ class SofascoreScraper(BaseScraper):
             logger.error(f"Error parsing Sofascore data: {e}")
         return players_data
 
-    def _parse_player_element(self, element: Any, league: str) -> Optional[Dict[str, Any]]:
-        """Parse individual player element"""
+    def _parse_player_row(self, row: Dict[str, Any], league: str) -> Optional[Dict[str, Any]]:
+        """Parse one player row harvested from the statistics page"""
         try:
-            name_el = element.find_element(By.CSS_SELECTOR, ".player-name, [data-testid='player-name']")
-            rating_el = element.find_element(By.CSS_SELECTOR, ".rating, [data-testid='rating']")
-            player_name = name_el.text.strip()
-            rating = self.parse_float(rating_el.text)
-
-            stats: Dict[str, int] = {}
-            stat_elements = element.find_elements(By.CSS_SELECTOR, ".stat-value, [data-testid*='stat']")
-            for i, stat in enumerate(stat_elements):
-                val = stat.text.strip()
-                if i == 0:
-                    stats['matches'] = self.parse_number(val)
-                elif i == 1:
-                    stats['goals'] = self.parse_number(val)
-                elif i == 2:
-                    stats['assists'] = self.parse_number(val)
-                elif i == 3:
-                    stats['minutes'] = self.parse_number(val)
+            if row.get('name') is None or row.get('rating') is None:
+                return None
+            player_name = row['name'].strip()
+            rating = self.parse_float(row['rating'])
+
+            # Leading stat cells are matches, goals, assists, minutes
+            values = [self.parse_number(val.strip()) for val in (row.get('stats') or [])[:4]]
+            stats = dict(zip(('matches', 'goals', 'assists', 'minutes'), values))
 
             sofascore_id: Optional[str] = None
-            try:
-                href = element.find_element(By.TAG_NAME, 'a').get_attribute('href')
-                if href and '/player/' in href:
-                    sofascore_id = href.split('/player/')[1].split('/')[0]
-            except NoSuchElementException:
-                pass
+            href = row.get('href')
+            if href and '/player/' in href:
+                sofascore_id = href.split('/player/')[1].split('/')[0]
 
             return {
                 'name': player_name,
@@ -155,7 +241,7 @@ class SofascoreScraper(BaseScraper):
                 'source': 'sofascore'
             }
         except Exception as e:
-            logger.debug(f"Could not parse player element: {e}")
+            logger.debug(f"Could not parse player row: {e}")
             return None
 
     def _extract_from_json_ld(self) -> List[Dict[str, Any]]:
@@ -177,21 +263,22 @@ class SofascoreScraper(BaseScraper):
         """Scrape detailed stats for a specific player"""
         if not sofascore_id:
             return None
-        try:
-            self.init_driver()
-            url = f"{self.BASE_URL}/player/{sofascore_id}"
-            self.driver.get(url)
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "[data-testid='player-details']"))
-            )
-            return {
-                'career_stats': self._extract_career_stats(),
-                'season_stats': self._extract_season_stats(),
-                'attributes': self._extract_player_attributes()
-            }
-        except Exception as e:
-            logger.error(f"Error scraping player details: {e}")
-            return None
+        with self._driver_lock:
+            try:
+                self.init_driver()
+                url = f"{self.BASE_URL}/player/{sofascore_id}"
+                self.driver.get(url)
+                WebDriverWait(self.driver, 10).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "[data-testid='player-details']"))
+                )
+                return {
+                    'career_stats': self._extract_career_stats(),
+                    'season_stats': self._extract_season_stats(),
+                    'attributes': self._extract_player_attributes()
+                }
+            except Exception as e:
+                logger.error(f"Error scraping player details: {e}")
+                return None
 
     def _extract_career_stats(self) -> Dict[str, Any]:
         """Extract career statistics"""
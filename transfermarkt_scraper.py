@@ -1,161 +1,387 @@
+import io
+import itertools
 import re
 import logging
-from typing import List, Dict, Optional, Any
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterator, Optional, Union
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
+import numpy as np
+import pandas as pd
+from lxml import etree, html as lxml_html
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow output is optional; records and column arrays still work
+    pa = None
 
-from scrapers.base_scraper import BaseScraper
+from scrapers.base_scraper import BaseScraper, clean_text, parse_number
 from config import Config
 
 # Configure module‐level logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Compiled once; used for every row of every page
+_TM_ID_RE = re.compile(r'/spieler/(\d+)')
+_DIGIT_RE = re.compile(r'\d+')
+_VALUE_STRIP_RE = re.compile(r'[€, ]')
+_VALUE_RE = re.compile(r'(\d+(?:\.\d*)?|\.\d+)([mk]?)')
+
+# Market value suffix -> multiplier
+_VALUE_MULTIPLIERS = {'m': 1_000_000, 'k': 1_000, '': 1}
+
+def _has_class(name: str) -> str:
+    """XPath predicate matching one token of the class attribute"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+# Compiled once; evaluated in C against the whole page or one row
+_NAME_LINK_XPATH = etree.XPath(f"(.//td[{_has_class('hauptlink')}])[1]//a[1]")
+_POS_CELL_XPATH = etree.XPath(f"(.//td[{_has_class('pos')}])[1]")
+_CENTERED_CELLS_XPATH = etree.XPath(f".//td[{_has_class('zentriert')}]")
+# Title of the first titled image that leads a centred cell (the club crest)
+_CLUB_TITLE_XPATH = etree.XPath(
+    f"(.//td[{_has_class('zentriert')}]/descendant::img[1][@title != ''])[1]/@title", smart_strings=False
+)
+_VALUE_CELL_XPATH = etree.XPath("(.//td[normalize-space(@class)='rechts hauptlink'])[1]")
+_TEXT_XPATH = etree.XPath('string()', smart_strings=False)
+_UTF8_HTML_PARSER = lxml_html.HTMLParser(encoding='utf-8')
+_TRANSFER_TABLE_XPATH = etree.XPath(f"(//div[{_has_class('responsive-table')}])[1]")
+
+@dataclass(slots=True)
+class PlayerRow:
+    """Market value record for one player on a league page"""
+    name: str
+    transfermarkt_id: Optional[str]
+    position: Optional[str]
+    age: Optional[int]
+    club: Optional[str]
+    league: str
+    # Raw cell text until the page's values are batch-parsed
+    market_value: Union[int, str, None]
+    source: str = 'transfermarkt'
+
+@dataclass(slots=True)
+class TransferRow:
+    """One entry of a player's transfer history"""
+    season: str
+    date: str
+    from_club: str
+    to_club: str
+    market_value: int
+    fee: int
+
+# Class tokens marking a player/transfer row
+_ROW_CLASSES = frozenset(('odd', 'even'))
+
+def _is_data_row(row) -> bool:
+    """Whether a tr element is a player/transfer row (odd/even class)"""
+    return not _ROW_CLASSES.isdisjoint((row.get('class') or '').split())
+
+def _utf8(html: Union[str, bytes]) -> bytes:
+    """Page as UTF-8 bytes; pages arrive as bytes from make_request_bytes"""
+    return html.encode() if isinstance(html, str) else html
+
+def _text_content(element) -> str:
+    """All text inside an element, like HtmlElement.text_content() for plain elements"""
+    return _TEXT_XPATH(element)
+
+def _single_string(element) -> Optional[str]:
+    """Text of an element holding exactly one string, possibly nested in
+    single-child tags (bs4's Tag.string); None otherwise"""
+    while len(element) == 1 and not element.text and not element[0].tail:
+        element = element[0]
+    return element.text if len(element) == 0 else None
+
+def _iter_player_rows(html: Union[str, bytes], league: str) -> Iterator[PlayerRow]:
+    """Yield the player rows of a league page as the parser closes them, with
+    market values still raw"""
+    rows = etree.iterparse(io.BytesIO(_utf8(html)), events=('end',), tag='tr', html=True, encoding='utf-8')
+    try:
+        for _, row in rows:
+            if not _is_data_row(row):
+                continue
+            data = _parse_player_row(row, league)
+            if data:
+                yield data
+            # Rows are parsed independently, so drop this one and the rows
+            # before it (unless it is nested inside another row)
+            if next(row.iterancestors('tr'), None) is None:
+                row.clear()
+                while row.getprevious() is not None:
+                    del row.getparent()[0]
+    except etree.LxmlError as e:
+        logger.warning(f"Could not parse Transfermarkt page for {league}: {e}")
+
+def _parse_row_values(players: List[PlayerRow]) -> np.ndarray:
+    """Market values of players in one batch pass; 0 where there was no value cell"""
+    values = np.zeros(len(players), dtype=np.int64)
+    valued = [i for i, p in enumerate(players) if p.market_value is not None]
+    values[valued] = _parse_values_batch([players[i].market_value for i in valued])
+    return values
+
+def parse_league_page(html: Union[str, bytes], league: str) -> List[PlayerRow]:
+    """Parse market values from Transfermarkt league HTML"""
+    players_data = list(_iter_player_rows(html, league))
+    for player, value in zip(players_data, _parse_row_values(players_data).tolist()):
+        player.market_value = value
+    
+    logger.info(f"Parsed {len(players_data)} players from Transfermarkt for {league}")
+    return players_data
+
+def parse_league_columns(html: Union[str, bytes], league: str) -> Dict[str, np.ndarray]:
+    """Parse a league page into one array per field (age is NaN where missing)
+    for vectorised analysis"""
+    players = list(_iter_player_rows(html, league))
+    columns = {
+        field: np.array([getattr(p, field) for p in players], dtype=object)
+        for field in ('name', 'transfermarkt_id', 'position', 'club')
+    }
+    columns['age'] = np.array([np.nan if p.age is None else p.age for p in players], dtype=np.float64)
+    columns['market_value'] = _parse_row_values(players)
+    
+    logger.info(f"Parsed {len(players)} players from Transfermarkt for {league}")
+    return columns
+
+def parse_league_arrow(html: Union[str, bytes], league: str) -> 'pa.RecordBatch':
+    """Parse a league page straight into an Arrow record batch with the
+    PlayerRow fields as columns (requires pyarrow)"""
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    
+    players = list(_iter_player_rows(html, league))
+    schema = pa.schema([
+        ('name', pa.string()),
+        ('transfermarkt_id', pa.string()),
+        ('position', pa.string()),
+        ('age', pa.int64()),
+        ('club', pa.string()),
+        ('league', pa.string()),
+        ('market_value', pa.int64()),
+        ('source', pa.string()),
+    ])
+    columns = {
+        field: [getattr(p, field) for p in players]
+        for field in schema.names if field != 'market_value'
+    }
+    columns['market_value'] = _parse_row_values(players)
+    
+    logger.info(f"Parsed {len(players)} players from Transfermarkt for {league}")
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+def _parse_player_row(row, league: str) -> Optional[PlayerRow]:
+    """Parse individual player row from Transfermarkt; market_value is left as
+    the raw cell text (None without a value cell) for the batch parse"""
+    try:
+        # Find player name and link
+        name_links = _NAME_LINK_XPATH(row)
+        if not name_links:
+            return None
+        
+        name_link = name_links[0]
+        player_name = clean_text(_text_content(name_link))
+        player_href = name_link.get('href', '')
+        
+        # Extract Transfermarkt ID from URL
+        tm_match = _TM_ID_RE.search(player_href)
+        tm_id = tm_match.group(1) if tm_match else None
+        
+        # Find position
+        pos_cells = _POS_CELL_XPATH(row)
+        position = clean_text(_text_content(pos_cells[0])) if pos_cells else None
+        
+        # Find age: first centred cell whose only string contains a digit
+        centered_cells = _CENTERED_CELLS_XPATH(row)
+        age = None
+        for cell in centered_cells:
+            only_string = _single_string(cell)
+            if only_string and _DIGIT_RE.search(only_string):
+                age = parse_number(_text_content(cell))
+                break
+        
+        # Find market value
+        value_cells = _VALUE_CELL_XPATH(row)
+        market_value = _text_content(value_cells[0]) if value_cells else None
+        
+        # Find club (via image title attribute)
+        club_titles = _CLUB_TITLE_XPATH(row)
+        club = club_titles[0] if club_titles else None
+        
+        return PlayerRow(player_name, tm_id, position, age, club, league, market_value)
+        
+    except Exception as e:
+        logger.error(f"Error parsing Transfermarkt player row: {e}")
+        return None
+
+def _mv(number: str, suffix: str) -> int:
+    """Market value from an amount and its lowercase 'm'/'k' suffix ('' for none)"""
+    return int(float(number) * _VALUE_MULTIPLIERS[suffix])
+
+def _parse_market_value(value_text: str) -> int:
+    """Parse market value from text like '€5.00m' or '€500k'"""
+    try:
+        # Strip currency symbols, commas, spaces
+        cleaned = _VALUE_STRIP_RE.sub('', value_text).lower().strip()
+        
+        # Plain amounts with an optional suffix cover real pages in one match
+        match = _VALUE_RE.fullmatch(cleaned)
+        if match:
+            return _mv(*match.groups())
+        
+        if 'm' in cleaned:
+            return int(float(cleaned.replace('m', '')) * 1_000_000)
+        if 'k' in cleaned:
+            return int(float(cleaned.replace('k', '')) * 1_000)
+        
+        return int(float(cleaned))
+    except Exception:
+        logger.warning(f"Could not parse market value: {value_text}")
+        return 0
+
+def _parse_values_batch(texts: List[str]) -> np.ndarray:
+    """Parse many market value texts at once, same rules as _parse_market_value"""
+    cleaned = pd.Series(texts, dtype=object).str.replace(_VALUE_STRIP_RE, '', regex=True).str.lower().str.strip()
+    millions = cleaned.str.contains('m', regex=False).to_numpy(dtype=bool)
+    thousands = ~millions & cleaned.str.contains('k', regex=False).to_numpy(dtype=bool)
+    numbers = cleaned.mask(millions, cleaned.str.replace('m', '', regex=False))
+    numbers = numbers.mask(thousands, numbers.str.replace('k', '', regex=False))
+    
+    multipliers = np.where(millions, 1_000_000.0, np.where(thousands, 1_000.0, 1.0))
+    with np.errstate(over='ignore', invalid='ignore'):
+        values = pd.to_numeric(numbers, errors='coerce').to_numpy(dtype=float) * multipliers
+        # Amounts beyond int64 are nonsense on a market value page; treat as unparseable
+        parsed = np.abs(values) < 2.0 ** 63
+    for i in np.flatnonzero(~parsed):
+        logger.warning(f"Could not parse market value: {texts[i]}")
+    # astype truncates toward zero like int()
+    return np.where(parsed, values, 0.0).astype(np.int64)
+
 class TransfermarktScraper(BaseScraper):
     """Scraper for Transfermarkt market values and transfer data"""
     
     BASE_URL = "https://www.transfermarkt.com"
     
-    def scrape_league(self, league: str) -> List[Dict[str, Any]]:
+    # League pages change slowly and past transfers hardly ever, so both
+    # outlive the default cache TTL
+    LEAGUE_CACHE_TTL_SECONDS = 12 * 3600
+    TRANSFERS_CACHE_TTL_SECONDS = 7 * 24 * 3600
+    
+    # League -> page URL (None when unconfigured); league config is read-only,
+    # so entries never go stale
+    _league_urls: Dict[str, Optional[str]] = {}
+    
+    def scrape_league(self, league: str, force_refresh: bool = False) -> List[PlayerRow]:
         """Scrape market values for a league"""
-        league_config = self.config.get_league_config(league)
-        if not league_config or 'transfermarkt_id' not in league_config:
+        url = self._league_url(league)
+        if not url:
             logger.error(f"No Transfermarkt configuration for league: {league}")
             return []
         
-        url = urljoin(self.BASE_URL, league_config['transfermarkt_id'])
-        html = self.make_request(url)
+        html = self.make_request_bytes(url, force_refresh=force_refresh, ttl_seconds=self.LEAGUE_CACHE_TTL_SECONDS)
         if not html:
             return []
         
         return self.parse_player_data(html, league)
     
-    def parse_player_data(self, html: str, league: str) -> List[Dict[str, Any]]:
-        """Parse market values from Transfermarkt HTML"""
-        soup = BeautifulSoup(html, 'html.parser')
-        players_data: List[Dict[str, Any]] = []
-        
-        # Find all player rows in the main table
-        player_rows = soup.find_all('tr', class_=['odd', 'even'])
-        for row in player_rows:
-            data = self._parse_player_row(row, league)
-            if data:
-                players_data.append(data)
-        
-        logger.info(f"Parsed {len(players_data)} players from Transfermarkt for {league}")
-        return players_data
-    
-    def _parse_player_row(self, row, league: str) -> Optional[Dict[str, Any]]:
-        """Parse individual player row from Transfermarkt"""
+    def _league_url(self, league: str) -> Optional[str]:
+        """Transfermarkt page URL for a league, built once per league"""
         try:
-            # Find player name and link
-            name_cell = row.find('td', class_='hauptlink')
-            if not name_cell:
-                return None
-            
-            name_link = name_cell.find('a')
-            if not name_link:
-                return None
-            
-            player_name = self.clean_text(name_link.text)
-            player_href = name_link.get('href', '')
-            
-            # Extract Transfermarkt ID from URL
-            tm_match = re.search(r'/spieler/(\d+)', player_href)
-            tm_id = tm_match.group(1) if tm_match else None
-            
-            # Find position
-            pos_cell = row.find('td', class_='pos')
-            position = self.clean_text(pos_cell.text) if pos_cell else None
-            
-            # Find age
-            age_cell = row.find('td', class_='zentriert', string=re.compile(r'\d+'))
-            age = self.parse_number(age_cell.text) if age_cell else None
-            
-            # Find market value
-            value_cell = row.find('td', class_='rechts hauptlink')
-            market_value = self._parse_market_value(value_cell.text) if value_cell else 0
-            
-            # Find club (via image title attribute)
-            club = None
-            for cell in row.find_all('td', class_='zentriert'):
-                img = cell.find('img')
-                if img and img.get('title'):
-                    club = img['title']
-                    break
-            
-            return {
-                'name': player_name,
-                'transfermarkt_id': tm_id,
-                'position': position,
-                'age': age,
-                'club': club,
-                'league': league,
-                'market_value': market_value,
-                'source': 'transfermarkt'
-            }
-            
-        except Exception as e:
-            logger.error(f"Error parsing Transfermarkt player row: {e}")
-            return None
+            return self._league_urls[league]
+        except KeyError:
+            league_config = self.config.get_league_config(league)
+            tm_path = league_config.get('transfermarkt_id') if league_config else None
+            url = urljoin(self.BASE_URL, tm_path) if tm_path is not None else None
+            self._league_urls[league] = url
+            return url
+    
+    def parse_player_data(
+        self,
+        html: Union[str, bytes],
+        league: str,
+        return_arrow: bool = False
+    ) -> Union[List[PlayerRow], 'pa.RecordBatch']:
+        """Parse market values from Transfermarkt HTML, as an Arrow record batch
+        with return_arrow"""
+        if return_arrow:
+            return parse_league_arrow(html, league)
+        return parse_league_page(html, league)
+    
+    def parse_player_columns(self, html: Union[str, bytes], league: str) -> Dict[str, np.ndarray]:
+        """Parse market values from Transfermarkt HTML as column arrays"""
+        return parse_league_columns(html, league)
     
     def _parse_market_value(self, value_text: str) -> int:
         """Parse market value from text like '€5.00m' or '€500k'"""
-        try:
-            # Strip currency symbols, commas, spaces
-            cleaned = value_text.replace('€', '').replace(',', '').replace(' ', '').lower()
-            
-            if 'm' in cleaned:
-                return int(float(cleaned.replace('m', '')) * 1_000_000)
-            if 'k' in cleaned:
-                return int(float(cleaned.replace('k', '')) * 1_000)
-            
-            return int(float(cleaned))
-        except Exception:
-            logger.warning(f"Could not parse market value: {value_text}")
-            return 0
+        return _parse_market_value(value_text)
     
-    def scrape_player_transfers(self, tm_id: str) -> List[Dict[str, Any]]:
+    def scrape_player_transfers(self, tm_id: str, force_refresh: bool = False) -> List[TransferRow]:
         """Scrape transfer history for a specific player"""
         if not tm_id:
             return []
         
         transfers_url = urljoin(self.BASE_URL, f"/spieler/transfers/spieler/{tm_id}")
-        html = self.make_request(transfers_url)
+        html = self.make_request_bytes(
+            transfers_url, force_refresh=force_refresh, ttl_seconds=self.TRANSFERS_CACHE_TTL_SECONDS
+        )
         if not html:
             return []
         
-        soup = BeautifulSoup(html, 'html.parser')
-        transfers: List[Dict[str, Any]] = []
+        return self._parse_transfers_html(html)
+    
+    def scrape_many_transfers(
+        self,
+        tm_ids: List[str],
+        force_refresh: bool = False
+    ) -> Dict[str, List[TransferRow]]:
+        """Scrape transfer histories for several players concurrently"""
+        tm_ids = list(dict.fromkeys(tm_ids))
+        if not tm_ids:
+            return {}
+        
+        # Fetches are network-bound; the shared host rate limiter still spaces
+        # them, but each request's latency overlaps the others
+        with ThreadPoolExecutor(max_workers=min(self.config.MAX_CONCURRENT_REQUESTS, len(tm_ids))) as executor:
+            histories = executor.map(lambda tm_id: self.scrape_player_transfers(tm_id, force_refresh), tm_ids)
+            return dict(zip(tm_ids, histories))
+    
+    def _parse_transfers_html(self, html: Union[str, bytes]) -> List[TransferRow]:
+        """Parse the transfer history table from a player's transfers page"""
+        try:
+            doc = lxml_html.document_fromstring(_utf8(html), parser=_UTF8_HTML_PARSER)
+        except etree.ParserError:
+            return []
+        transfers: List[TransferRow] = []
         
-        transfer_table = soup.find('div', class_='responsive-table')
-        if not transfer_table:
+        transfer_tables = _TRANSFER_TABLE_XPATH(doc)
+        if not transfer_tables:
             return transfers
         
-        for row in transfer_table.find_all('tr', class_=['odd', 'even']):
+        # iter() walks the table lazily in C; no row list is built up front
+        for row in transfer_tables[0].iter('tr'):
+            if not _is_data_row(row):
+                continue
             t = self._parse_transfer_row(row)
             if t:
                 transfers.append(t)
         
         return transfers
     
-    def _parse_transfer_row(self, row) -> Optional[Dict[str, Any]]:
+    def _parse_transfer_row(self, row) -> Optional[TransferRow]:
         """Parse individual transfer record"""
         try:
-            cells = row.find_all('td')
-            if len(cells) < 5:
+            # Read each needed cell's text once, in C
+            texts = [_text_content(cell) for cell in itertools.islice(row.iter('td'), 6)]
+            if len(texts) < 5:
                 return None
             
-            transfer_data: Dict[str, Any] = {
-                'season':    self.clean_text(cells[0].text),
-                'date':      self.clean_text(cells[1].text),
-                'from_club': self.clean_text(cells[2].text),
-                'to_club':   self.clean_text(cells[3].text),
-                'market_value': self._parse_market_value(cells[4].text),
-                'fee':          self._parse_market_value(cells[5].text) if len(cells) > 5 else 0
-            }
-            return transfer_data
+            return TransferRow(
+                season=clean_text(texts[0]),
+                date=clean_text(texts[1]),
+                from_club=clean_text(texts[2]),
+                to_club=clean_text(texts[3]),
+                market_value=_parse_market_value(texts[4]),
+                fee=_parse_market_value(texts[5]) if len(texts) > 5 else 0
+            )
         except Exception as e:
             logger.error(f"Error parsing transfer row: {e}")
             return None